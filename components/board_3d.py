@@ -0,0 +1,48 @@
+import os
+import plotly.offline
+import streamlit.components.v1 as components
+from engine.bitboard import LINES, PLAYERS
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "board_3d")
+
+def write_plotly_js(component_dir=COMPONENT_DIR):
+    """Copy the installed plotly package's plotly.js next to index.html and return its path.
+
+    The file is generated rather than committed, and is rewritten only when
+    the installed bundle differs from it.
+    """
+    js = plotly.offline.get_plotlyjs()
+    path = os.path.join(component_dir, "plotly.min.js")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            if f.read() == js:
+                return path
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(js)
+    os.replace(path + ".tmp", path)
+    return path
+
+# A static component: index.html keeps the Plotly figure alive in the browser
+write_plotly_js()
+_board_3d = components.declare_component("board_3d", path=COMPONENT_DIR)
+
+def board_state(board):
+    """The board as 64 characters, 'X', 'O' or '.', in cell index order"""
+    cells = ['.'] * 64
+    for index, side in board.history:
+        cells[index] = PLAYERS[side]
+    return ''.join(cells)
+
+def board_3d(board, winning_line=None, key=None):
+    """Render the 3D board.
+
+    Only the cell string and the winning cells are sent on each rerun; the
+    component restyles the changed markers and keeps the grid, layout and
+    camera on the client.
+    """
+    win = list(LINES[winning_line]) if winning_line is not None else []
+    _board_3d(cells=board_state(board), win=win, key=key, default=None)
+
+if __name__ == "__main__":
+    # Prewrite for deployments that serve the component directory read-only
+    print(write_plotly_js())
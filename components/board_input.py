@@ -0,0 +1,31 @@
+import os
+import streamlit as st
+import streamlit.components.v1 as components
+from components.board_3d import board_state
+from engine.bitboard import cell_coords
+
+# A static component: index.html draws the four layers as one clickable grid
+_board_input = components.declare_component(
+    "board_input",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "board_input")
+)
+
+def board_input(board, disabled=False, key="board_input"):
+    """Render all four layers as one widget and return the clicked (z, y, x).
+
+    Returns None when there is no new click. A component keeps returning its
+    last value on every rerun, so each click carries a nonce and is only
+    reported the first time it is seen. A click that arrives while the board
+    is disabled, such as a late one on the bot's turn, is seen but dropped.
+    """
+    value = _board_input(cells=board_state(board), disabled=disabled, key=key, default=None)
+    nonce_key = f"{key}_nonce"
+    if not value or value['nonce'] == st.session_state.get(nonce_key):
+        return None
+    st.session_state[nonce_key] = value['nonce']
+    if disabled:
+        return None
+    z, y, x = cell_coords(value['cell'])
+    if not board.is_empty(z, y, x):
+        return None
+    return z, y, x
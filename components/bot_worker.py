@@ -0,0 +1,105 @@
+import streamlit as st
+import logging
+import os
+from engine import book, parallel, search
+from engine.mcts import TreeCache
+from engine.service import BotService, BotServiceBusy
+from engine.transposition import TranspositionTable
+
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def get_opening_book():
+    """The opening book built by `python -m engine.book`, loaded once per server"""
+    return book.load_book()
+
+@st.cache_resource
+def get_root_cache():
+    """Chosen bot moves by canonical position, shared by every session and game"""
+    return TranspositionTable()
+
+@st.cache_resource
+def get_parallel_search():
+    """Process pool for parallel root search, kept warm across reruns and sessions.
+
+    A pool only pays off with more than one core to spread the root moves
+    over, so this is None on single-core machines. It is also None when the
+    workers fail to start, and the bot searches serially.
+    """
+    if (os.cpu_count() or 1) <= 1:
+        return None
+    try:
+        return parallel.ParallelSearch()
+    except Exception:
+        logger.exception("Parallel search pool failed to start; searching serially")
+        return None
+
+@st.cache_resource
+def get_bot_service():
+    """The one queue and worker pool that computes bot moves for every session"""
+    return BotService(get_opening_book(), get_root_cache(), get_parallel_search(), TreeCache())
+
+def init_bot_worker():
+    if 'bot_job' not in st.session_state:
+        st.session_state.bot_job = None
+
+def start_bot_job(board, difficulty):
+    """Queue a bot move for board on the shared bot service.
+
+    Returns False without queueing anything when the service is saturated,
+    so the caller can fall back to a cheap move.
+    """
+    cancel_bot_job()
+    try:
+        future = get_bot_service().submit(board, difficulty)
+    except BotServiceBusy:
+        return False
+    st.session_state.bot_job = {'future': future, 'difficulty': difficulty}
+    return True
+
+def cancel_bot_job():
+    """Withdraw a queued or running bot move, e.g. when a new game starts"""
+    job = st.session_state.get('bot_job')
+    if job:
+        job['future'].cancel()
+    st.session_state.bot_job = None
+
+def bot_is_thinking():
+    return st.session_state.get('bot_job') is not None
+
+def bot_service_stats():
+    return get_bot_service().stats()
+
+def bot_search_summary():
+    """Search stats aggregated per difficulty across every session"""
+    return get_bot_service().search_summary()
+
+@st.fragment(run_every=0.5)
+def poll_bot_job(on_move):
+    """Show the thinking state and call on_move(z, y, x) once the move is ready.
+
+    Only this fragment reruns while the bot thinks, so the rest of the page
+    stays responsive. The move's search stats are kept in
+    st.session_state.last_bot_stats.
+    """
+    job = st.session_state.get('bot_job')
+    if not job:
+        return
+
+    future = job['future']
+    if not future.done():
+        st.caption("🤔 Bot is thinking...")
+        return
+
+    st.session_state.bot_job = None
+    try:
+        (z, y, x), st.session_state.last_bot_stats = future.result()
+    except Exception as e:
+        # Search here with the level's own time budget so the game goes on
+        logger.exception("Bot search failed for %s; searching serially", job['difficulty'])
+        st.warning(f"Bot search failed, searching again: {str(e)}")
+        level = search.DIFFICULTY_LEVELS[job['difficulty']]
+        # MCTS levels have no depth limit of their own; search as deep as hard does
+        max_depth = level['max_depth'] or search.DIFFICULTY_LEVELS['hard']['max_depth']
+        z, y, x = search.make_timed_move(st.session_state.board, level['time_ms'], max_depth)
+    on_move(z, y, x)
@@ -3,24 +3,45 @@ from database.manager import DatabaseManager
 import plotly.express as px
 import pandas as pd
 
+METRIC_LABELS = {
+    'win_rate': 'Win Rate (%)',
+    'wins': 'Wins',
+    'games': 'Games Played',
+    'avg_moves': 'Avg Moves/Game'
+}
+PAGE_SIZE = 10
+
 def display_leaderboard():
     st.markdown("## Global Leaderboard")
     
-    leaderboard = DatabaseManager.get_leaderboard()
-    if not leaderboard:
+    total = DatabaseManager.count_leaderboard()
+    if not total:
         st.info("No players have played enough games yet to be ranked!")
         return
     
+    col1, col2 = st.columns(2)
+    with col1:
+        metric = st.selectbox(
+            "Rank by",
+            list(METRIC_LABELS),
+            format_func=METRIC_LABELS.get,
+            key="leaderboard_metric"
+        )
+    with col2:
+        pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="leaderboard_page")
+    
+    leaderboard = DatabaseManager.get_leaderboard(limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE, order_by=metric)
     df = pd.DataFrame(leaderboard)
     
-    # Create a bar chart for win rates
+    # Create a bar chart for the selected metric
     fig = px.bar(
         df,
         x='username',
-        y='win_rate',
-        title='Top Players by Win Rate',
-        labels={'username': 'Player', 'win_rate': 'Win Rate (%)'},
-        color='win_rate',
+        y=metric,
+        title=f'Top Players by {METRIC_LABELS[metric]}',
+        labels={'username': 'Player', metric: METRIC_LABELS[metric]},
+        color=metric,
         color_continuous_scale='Viridis'
     )
     st.plotly_chart(fig, use_container_width=True)
@@ -30,11 +51,13 @@ def display_leaderboard():
         df.style.format({
             'win_rate': '{:.1f}%',
             'games': '{:,d}',
-            'wins': '{:,d}'
+            'wins': '{:,d}',
+            'avg_moves': '{:.1f}'
         }),
         hide_index=True,
         use_container_width=True
     )
+    st.caption(f"{total:,} ranked players • page {page} of {pages}")
 
 def display_global_stats():
     st.markdown("## Global Statistics")
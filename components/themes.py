@@ -1,5 +1,13 @@
+import hashlib
+import os
 import streamlit as st
 
+BASE_CSS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles", "base.css")
+# Streamlit serves ./static next to main.py at app/static/ (server.enableStaticServing)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "css")
+STATIC_URL = "app/static/css"
+THEME_VARIABLES = ('x_color', 'o_color', 'grid_color', 'empty_color', 'background')
+
 THEMES = {
     'classic': {
         'name': 'Classic',
@@ -43,34 +51,9 @@ def get_current_theme():
     return THEMES[st.session_state.theme]
 
 def apply_theme(theme_name):
+    """Switch theme; the next apply_styles marks the page with the new theme class"""
     st.session_state.theme = theme_name
-    theme = THEMES[theme_name]
-    
-    st.markdown(f"""
-        <style>
-        .main {{
-            background-color: {theme['background']};
-        }}
-        .stButton button {{
-            font-size: 24px;
-            font-weight: bold;
-            height: 60px;
-            background-color: {theme['background']};
-            color: #333333;
-            border: 1px solid {theme['grid_color']};
-        }}
-        .stButton button:contains("X") {{
-            background-color: {theme['x_color']} !important;
-            color: {'white' if theme_name != 'classic' else 'white'} !important;
-            border: none !important;
-        }}
-        .stButton button:contains("O") {{
-            background-color: {theme['o_color']} !important;
-            color: {'white' if theme_name != 'classic' else 'black'} !important;
-            border: 2px solid {theme['x_color']} !important;
-        }}
-        </style>
-    """, unsafe_allow_html=True)
+    st.session_state.theme_selected = True
 
 def display_theme_selector():
     st.sidebar.markdown("## Theme")
@@ -84,4 +67,66 @@ def display_theme_selector():
     # Convert theme name back to key
     selected_key = [k for k, v in THEMES.items() if v['name'] == selected_theme][0]
     if selected_key != st.session_state.theme:
-        apply_theme(selected_key)
\ No newline at end of file
+        apply_theme(selected_key)
+        st.rerun()
+
+def _theme_block(key, theme):
+    """A theme's variables and the rules using them, scoped to its marker class"""
+    scope = f".stApp:has(.theme-{key})"
+    variables = "".join(f"    --theme-{name.replace('_', '-')}: {theme[name]};\n" for name in THEME_VARIABLES)
+    return (
+        f"{scope} {{\n{variables}    background-color: var(--theme-background);\n}}\n\n"
+        f"{scope} .stButton button:not(:hover) {{\n    border-color: var(--theme-grid-color);\n}}\n"
+    )
+
+def compile_stylesheet():
+    """The base styles followed by the rules for each theme.
+
+    A theme only applies while its marker class is on the page, so every
+    theme ships in the same file, switching needs no new CSS, and a page
+    with no theme selected keeps Streamlit's own colours.
+    """
+    with open(BASE_CSS) as f:
+        parts = [f.read(), "/* Themes */"]
+    for key, theme in THEMES.items():
+        parts.append(_theme_block(key, theme))
+    return "\n".join(parts)
+
+def build_stylesheet(static_dir=STATIC_DIR):
+    """Write the compiled stylesheet under a content-hashed name and return that name.
+
+    An unchanged build keeps its name, so browsers keep using their copy;
+    any edit to base.css or THEMES produces a new URL. Older builds are removed.
+    """
+    css = compile_stylesheet()
+    name = f"app.{hashlib.sha256(css.encode()).hexdigest()[:12]}.css"
+    path = os.path.join(static_dir, name)
+    os.makedirs(static_dir, exist_ok=True)
+    if not os.path.exists(path):
+        with open(path + ".tmp", "w") as f:
+            f.write(css)
+        os.replace(path + ".tmp", path)
+    for old in os.listdir(static_dir):
+        if old.startswith("app.") and old.endswith(".css") and old != name:
+            os.remove(os.path.join(static_dir, old))
+    return name
+
+@st.cache_resource
+def get_stylesheet_url():
+    """Build the stylesheet once per server process"""
+    return f"{STATIC_URL}/{build_stylesheet()}"
+
+def apply_styles():
+    """Link the compiled stylesheet and, once one is selected, mark the theme.
+
+    Both elements are identical from one rerun to the next, so the browser
+    fetches the stylesheet once and a theme switch only changes one class.
+    Until apply_theme is called no marker is emitted and no theme applies.
+    """
+    st.html(f'<style>@import url("{get_stylesheet_url()}");</style>')
+    if st.session_state.get('theme_selected'):
+        st.html(f'<div class="theme-marker theme-{st.session_state.theme}"></div>')
+
+if __name__ == "__main__":
+    # Prebuild for deployments that serve static/ read-only
+    print(os.path.join(STATIC_DIR, build_stylesheet()))
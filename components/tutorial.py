@@ -1,7 +1,7 @@
 import streamlit as st
-import numpy as np
 from streamlit_extras.switch_page_button import switch_page
 import time
+from engine.bitboard import Board
 
 def create_tutorial():
     steps = [
@@ -11,7 +11,7 @@ def create_tutorial():
             This tutorial will guide you through the basics of playing 3D Tic Tac Toe.
             The game is played on a 4x4x4 cube, giving you many more possibilities than traditional Tic Tac Toe!
             """,
-            "board": np.full((4, 4, 4), '', dtype=object)
+            "board": Board()
         },
         {
             "title": "Making Moves",
@@ -51,17 +51,14 @@ def create_tutorial():
             
             Now you're ready to play! Good luck!
             """,
-            "board": np.full((4, 4, 4), '', dtype=object)
+            "board": Board()
         }
     ]
     
     return steps
 
 def create_example_board(moves):
-    board = np.full((4, 4, 4), '', dtype=object)
-    for z, y, x, player in moves:
-        board[z, y, x] = player
-    return board
+    return Board.from_moves(moves)
 
 def run_tutorial():
     if 'tutorial_step' not in st.session_state:
@@ -1,6 +1,7 @@
 import streamlit as st
 import numpy as np
 from database.manager import DatabaseManager
+from components.bot_worker import bot_search_summary
 
 def init_user_system():
     if 'user' not in st.session_state:
@@ -46,7 +47,14 @@ def render_auth_ui():
                     st.sidebar.success(f"Database seeded successfully! Created {users_created} sample users.")
                 except Exception as e:
                     st.sidebar.error(f"Error seeding database: {str(e)}")
-            
+
+            if st.sidebar.button("🧮 Rebuild User Stats"):
+                try:
+                    users_rebuilt = DatabaseManager.rebuild_user_stats()
+                    st.sidebar.success(f"Rebuilt stats for {users_rebuilt} users.")
+                except Exception as e:
+                    st.sidebar.error(f"Error rebuilding stats: {str(e)}")
+
             # Make user admin
             with st.sidebar.form("make_admin_form"):
                 st.markdown("### Make User Admin")
@@ -56,7 +64,19 @@ def render_auth_ui():
                         st.success(f"Made {username_to_admin} an admin!")
                     else:
                         st.error(f"User {username_to_admin} not found!")
-        
+
+            # Bot search stats, to tune time budgets and spot slow positions
+            if st.sidebar.checkbox("Show bot search stats", key="show_search_stats"):
+                if st.session_state.get('last_bot_stats'):
+                    st.sidebar.markdown("### Last Bot Move")
+                    st.sidebar.json(st.session_state.last_bot_stats)
+                st.sidebar.markdown("### By Difficulty")
+                summary = bot_search_summary()
+                if summary:
+                    st.sidebar.json(summary)
+                else:
+                    st.sidebar.info("No bot searches yet")
+
         if st.sidebar.button("Logout"):
             st.session_state.user = None
             st.session_state.stored_user = None
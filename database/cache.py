@@ -0,0 +1,107 @@
+"""Read-through cache for DatabaseManager queries.
+
+Read methods decorated with @cached keep their results in one process-wide
+QueryCache, shared by every Streamlit session. Entries are keyed by method
+name and arguments. Each method sets its own time to live, and the least
+recently used entries are evicted once the cache is full.
+
+Writes invalidate what they change through invalidate(), by method name
+and optionally by leading arguments. The TTLs only bound staleness from
+writes this process cannot see, such as another server process or a
+manual edit of the database.
+"""
+
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """Query results by key, with a per-entry expiry and LRU eviction"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, so a load that raced one is not stored
+        self.generation = 0
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'invalidated': 0}
+
+    def get_or_load(self, key, ttl, load):
+        """The cached value for key, or load() stored for ttl seconds.
+
+        Callers get a copy, so mutating a result never changes the cache.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return copy.deepcopy(value)
+                del self.entries[key]
+                self.counters['expired'] += 1
+            self.counters['misses'] += 1
+            generation = self.generation
+
+        # Query outside the lock so sessions missing different keys run in parallel
+        value = load()
+
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.counters['evicted'] += 1
+        return value
+
+    def invalidate(self, *prefix):
+        """Drop every entry whose key starts with prefix; no prefix drops all"""
+        with self.lock:
+            self.generation += 1
+            stale = [key for key in self.entries if key[:len(prefix)] == prefix]
+            for key in stale:
+                del self.entries[key]
+            self.counters['invalidated'] += len(stale)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return dict(
+                self.counters,
+                entries=len(self.entries),
+                max_entries=self.max_entries,
+                hit_rate=self.counters['hits'] / lookups if lookups else 0.0
+            )
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# One cache per server process, shared by all sessions
+query_cache = QueryCache()
+
+
+def cached(ttl):
+    """Cache a read method's results for ttl seconds, keyed by its arguments.
+
+    Arguments are normalised through the signature, so get_leaderboard(5)
+    and get_leaderboard(limit=5) share an entry. The key is the method name
+    followed by every argument in order, which is what invalidate() matches.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__name__,) + tuple(bound.arguments.values())
+            return query_cache.get_or_load(key, ttl, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
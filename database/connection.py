@@ -0,0 +1,112 @@
+"""Engine construction and connection pool metrics.
+
+create_db_engine applies per-dialect settings:
+
+- Postgres: a bounded QueuePool with pre-ping, recycling and a connect
+  timeout; each connection also gets a statement timeout.
+- SQLite: every connection switches to WAL with synchronous=NORMAL and
+  waits on a busy_timeout instead of failing with "database is locked".
+
+models.get_engine builds one engine per server process with it, and a
+PoolMonitor counts what the pool does.
+"""
+
+import threading
+
+from sqlalchemy import create_engine, event, make_url
+
+POSTGRES_POOL = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,  # seconds to wait for a free connection
+    'pool_recycle': 1800,  # seconds; replace connections before servers drop them
+    'pool_pre_ping': True,
+}
+POSTGRES_CONNECT_TIMEOUT = 10  # seconds
+POSTGRES_STATEMENT_TIMEOUT_MS = 15000
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def create_db_engine(url):
+    """An engine for url with the pool and timeout settings for its dialect"""
+    backend = make_url(url).get_backend_name()
+    if backend == 'sqlite':
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine
+    if backend == 'postgresql':
+        return create_engine(
+            url,
+            connect_args={
+                "connect_timeout": POSTGRES_CONNECT_TIMEOUT,
+                "options": f"-c statement_timeout={POSTGRES_STATEMENT_TIMEOUT_MS}",
+            },
+            **POSTGRES_POOL
+        )
+    return create_engine(url, pool_pre_ping=True)
+
+
+class PoolMonitor:
+    """Counts connections opened, checked out and in, and invalidated by a pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+        self.counters = {'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidated': 0}
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def attach(self, engine):
+        """Count engine's pool from now on; counts from an earlier engine are dropped"""
+        with self.lock:
+            self.pool = engine.pool
+            self.counters = dict.fromkeys(self.counters, 0)
+            self.in_use = 0
+            self.peak_in_use = 0
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.counters['connects'] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self.lock:
+            self.counters['checkouts'] += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.counters['checkins'] += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self.lock:
+            self.counters['invalidated'] += 1
+
+    def stats(self):
+        """Counters since attach, plus the pool's own gauges where it has them"""
+        with self.lock:
+            stats = dict(self.counters, in_use=self.in_use, peak_in_use=self.peak_in_use)
+        if self.pool is not None:
+            stats['pool'] = type(self.pool).__name__
+            for gauge in ('size', 'checkedin', 'checkedout', 'overflow'):
+                if hasattr(self.pool, gauge):
+                    stats[gauge] = getattr(self.pool, gauge)()
+        # Connections opened per checkout; near zero means connections are reused
+        stats['churn'] = stats['connects'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
@@ -3,9 +3,14 @@ import json
 import bcrypt
 import random
 import streamlit as st
-from .models import User, Game, UserAchievement, GlobalStats, get_db_session, Base
+from .cache import cached, query_cache
+from .models import User, Game, UserAchievement, UserStats, GlobalStats, get_db_session, get_pool_stats, Base
 from sqlalchemy.orm import Session
-from sqlalchemy import func, create_engine
+from sqlalchemy import func, case, create_engine
+from sqlalchemy.exc import IntegrityError
+
+# Columns get_leaderboard can rank by
+LEADERBOARD_METRICS = ('win_rate', 'wins', 'games', 'avg_moves')
 
 class DatabaseManager:
     @staticmethod
@@ -17,7 +22,10 @@ class DatabaseManager:
             # Create user
             user = User(username=username, password_hash=password_hash)
             session.add(user)
+            session.flush()
+            session.add(DatabaseManager._empty_user_stats(user.id))
             session.commit()
+            query_cache.invalidate('get_user_stats', username)
             return user
     
     @staticmethod
@@ -41,6 +49,7 @@ class DatabaseManager:
                 return False
             user.is_admin = True
             session.commit()
+            query_cache.invalidate('get_user_stats', username)
             return True
     
     @staticmethod
@@ -69,6 +78,14 @@ class DatabaseManager:
             )
             session.add(game)
             
+            # Update the player's totals
+            user_stats = session.get(UserStats, user.id)
+            if user_stats is None:
+                # Recomputing picks up the game just added
+                user_stats = DatabaseManager._compute_user_stats(session, user.id)
+            else:
+                DatabaseManager._count_game(user_stats, winner, moves_count, duration)
+            
             # Update global stats
             stats = session.query(GlobalStats).first()
             if not stats:
@@ -86,8 +103,10 @@ class DatabaseManager:
             
             if winner and (not stats.fastest_win or duration < stats.fastest_win):
                 stats.fastest_win = duration
+            stats.longest_win_streak = max(stats.longest_win_streak or 0, user_stats.longest_streak)
             
             session.commit()
+            DatabaseManager._invalidate_game_stats(username)
             return game
     
     @staticmethod
@@ -111,71 +130,198 @@ class DatabaseManager:
                 achievement_id=achievement_id
             )
             session.add(achievement)
-            session.commit()
+            try:
+                session.commit()
+            except IntegrityError:
+                # Unlocked concurrently by another session; the unique index kept one
+                session.rollback()
+                return False
+            query_cache.invalidate('get_user_stats', username)
             return True
     
     @staticmethod
+    def _invalidate_game_stats(username: str):
+        """Drop the cached reads a finished game changes"""
+        query_cache.invalidate('get_user_stats', username)
+        query_cache.invalidate('get_leaderboard')
+        query_cache.invalidate('count_leaderboard')
+        query_cache.invalidate('get_global_stats')
+    
+    @staticmethod
+    def cache_stats() -> dict:
+        """Hit/miss counters and size of the shared query cache"""
+        return query_cache.stats()
+    
+    @staticmethod
+    def pool_stats() -> dict:
+        """Connection pool usage of the shared engine"""
+        return get_pool_stats()
+    
+    @staticmethod
+    @cached(ttl=300)
     def get_user_stats(username: str) -> dict:
         with get_db_session() as session:
-            user = session.query(User).filter(User.username == username).first()
-            if not user:
-                return None
-            
-            games = session.query(Game).filter(Game.user_id == user.id)
-            achievements = session.query(UserAchievement).filter(
-                UserAchievement.user_id == user.id
-            )
-            
-            total_games = games.count()
-            if total_games == 0:
-                return {
-                    'total_games': 0,
-                    'wins': 0,
-                    'losses': 0,
-                    'draws': 0,
-                    'win_rate': 0,
-                    'avg_moves': 0,
-                    'total_time': 0,
-                    'achievements': []
-                }
-            
-            stats = {
-                'total_games': total_games,
-                'wins': games.filter(Game.winner == 'X').count(),
-                'losses': games.filter(Game.winner == 'O').count(),
-                'draws': games.filter(Game.winner == None).count(),
-                'win_rate': games.filter(Game.winner == 'X').count() / total_games * 100,
-                'avg_moves': games.with_entities(func.avg(Game.moves_count)).scalar() or 0,
-                'total_time': games.with_entities(func.sum(Game.duration)).scalar() or 0,
-                'achievements': [a.achievement_id for a in achievements.all()]
-            }
-            
-            return stats
+            try:
+                return DatabaseManager._read_user_stats(session, username)
+            except IntegrityError:
+                # Another session backfilled the same user first; read its row
+                session.rollback()
+                return DatabaseManager._read_user_stats(session, username)
+    
+    @staticmethod
+    def _read_user_stats(session: Session, username: str) -> dict:
+        row = session.query(User.id, UserStats).outerjoin(
+            UserStats, UserStats.user_id == User.id
+        ).filter(User.username == username).first()
+        if not row:
+            return None
+        
+        user_id, user_stats = row
+        backfilled = user_stats is None
+        if backfilled:
+            # Users from before the user_stats table get their row on first read
+            user_stats = DatabaseManager._compute_user_stats(session, user_id)
+        
+        total_games = user_stats.total_games
+        stats = {
+            'total_games': total_games,
+            'wins': user_stats.wins,
+            'losses': user_stats.losses,
+            'draws': user_stats.draws,
+            'win_rate': user_stats.wins / total_games * 100 if total_games else 0,
+            'avg_moves': user_stats.total_moves / total_games if total_games else 0,
+            'total_time': user_stats.total_time,
+            'current_streak': user_stats.current_streak,
+            'longest_streak': user_stats.longest_streak,
+            'fastest_win': user_stats.fastest_win,
+            'achievements': [a for (a,) in session.query(UserAchievement.achievement_id).filter(
+                UserAchievement.user_id == user_id
+            )]
+        }
+        if backfilled:
+            session.commit()
+        return stats
+    
+    @staticmethod
+    def _empty_user_stats(user_id: int) -> UserStats:
+        return UserStats(
+            user_id=user_id,
+            total_games=0,
+            wins=0,
+            losses=0,
+            draws=0,
+            total_moves=0,
+            total_time=0.0,
+            current_streak=0,
+            longest_streak=0
+        )
+    
+    @staticmethod
+    def _count_game(user_stats: UserStats, winner: str, moves_count: int, duration: float):
+        """Add one finished game to a user's totals; the player is X"""
+        user_stats.total_games += 1
+        user_stats.total_moves += moves_count or 0
+        user_stats.total_time += duration or 0
+        if winner == 'X':
+            user_stats.wins += 1
+            user_stats.current_streak += 1
+            user_stats.longest_streak = max(user_stats.longest_streak, user_stats.current_streak)
+            if duration is not None and (user_stats.fastest_win is None or duration < user_stats.fastest_win):
+                user_stats.fastest_win = duration
+        else:
+            if winner == 'O':
+                user_stats.losses += 1
+            else:
+                user_stats.draws += 1
+            user_stats.current_streak = 0
     
     @staticmethod
-    def get_leaderboard() -> list:
+    def _compute_user_stats(session: Session, user_id: int) -> UserStats:
+        """Recompute one user's totals from the games table, oldest game first"""
+        user_stats = DatabaseManager._empty_user_stats(user_id)
+        games = session.query(Game.winner, Game.moves_count, Game.duration).filter(
+            Game.user_id == user_id
+        ).order_by(Game.created_at, Game.id)
+        for winner, moves_count, duration in games:
+            DatabaseManager._count_game(user_stats, winner, moves_count, duration)
+        return session.merge(user_stats)
+    
+    @staticmethod
+    def _rebuild_user_stats(session: Session) -> int:
+        """Replace every user_stats row with totals recomputed from games"""
+        session.query(UserStats).delete()
+        totals = {user_id: DatabaseManager._empty_user_stats(user_id) for (user_id,) in session.query(User.id)}
+        games = session.query(Game.user_id, Game.winner, Game.moves_count, Game.duration).order_by(
+            Game.user_id, Game.created_at, Game.id
+        )
+        for user_id, winner, moves_count, duration in games.yield_per(1000):
+            if user_id in totals:
+                DatabaseManager._count_game(totals[user_id], winner, moves_count, duration)
+        session.add_all(totals.values())
+        
+        stats = session.query(GlobalStats).first()
+        if stats:
+            stats.longest_win_streak = max((t.longest_streak for t in totals.values()), default=0)
+        return len(totals)
+    
+    @staticmethod
+    def rebuild_user_stats() -> int:
+        """Recompute the user_stats table from games; returns the number of users"""
         with get_db_session() as session:
-            # Get top 10 players by win rate (minimum 10 games)
-            leaderboard = []
-            users = session.query(User).all()
-            
-            for user in users:
-                games = session.query(Game).filter(Game.user_id == user.id)
-                total_games = games.count()
-                
-                if total_games >= 10:
-                    wins = games.filter(Game.winner == 'X').count()
-                    win_rate = wins / total_games * 100
-                    leaderboard.append({
-                        'username': user.username,
-                        'games': total_games,
-                        'wins': wins,
-                        'win_rate': win_rate
-                    })
-            
-            return sorted(leaderboard, key=lambda x: x['win_rate'], reverse=True)[:10]
+            count = DatabaseManager._rebuild_user_stats(session)
+            session.commit()
+            query_cache.invalidate()
+            return count
+    
+    @staticmethod
+    def _leaderboard_query(session: Session, min_games: int):
+        """One row per ranked player: games, wins, win rate and average moves"""
+        games = func.count(Game.id)
+        wins = func.sum(case((Game.winner == 'X', 1), else_=0))
+        return session.query(
+            User.username.label('username'),
+            games.label('games'),
+            wins.label('wins'),
+            (wins * 100.0 / games).label('win_rate'),
+            func.avg(Game.moves_count).label('avg_moves')
+        ).join(Game, Game.user_id == User.id).group_by(User.id, User.username).having(games >= min_games)
     
     @staticmethod
+    @cached(ttl=60)
+    def get_leaderboard(limit: int = 10, offset: int = 0, order_by: str = 'win_rate', min_games: int = 10) -> list:
+        """A page of players with at least min_games games, best first.
+
+        Grouping, filtering, ordering and paging all happen in one query.
+        order_by is one of LEADERBOARD_METRICS; ties are broken by username
+        so pages never overlap.
+        """
+        if order_by not in LEADERBOARD_METRICS:
+            raise ValueError(f"Unknown leaderboard metric: {order_by}")
+        with get_db_session() as session:
+            ranked = DatabaseManager._leaderboard_query(session, min_games).subquery()
+            metric = ranked.c[order_by]
+            # Fewer moves per game ranks higher
+            order = metric.asc() if order_by == 'avg_moves' else metric.desc()
+            rows = session.query(ranked).order_by(order, ranked.c.username).limit(limit).offset(offset).all()
+            return [{
+                'rank': offset + i + 1,
+                'username': row.username,
+                'games': row.games,
+                'wins': row.wins,
+                'win_rate': float(row.win_rate),
+                'avg_moves': float(row.avg_moves or 0)
+            } for i, row in enumerate(rows)]
+    
+    @staticmethod
+    @cached(ttl=60)
+    def count_leaderboard(min_games: int = 10) -> int:
+        """Number of players with at least min_games games"""
+        with get_db_session() as session:
+            ranked = DatabaseManager._leaderboard_query(session, min_games).subquery()
+            return session.query(func.count()).select_from(ranked).scalar() or 0
+    
+    @staticmethod
+    @cached(ttl=60)
     def get_global_stats() -> dict:
         with get_db_session() as session:
             stats = session.query(GlobalStats).first()
@@ -283,10 +429,14 @@ class DatabaseManager:
             stats.draws = session.query(func.count(Game.id)).filter(Game.winner == None).scalar() or 0
             stats.fastest_win = session.query(func.min(Game.duration)).filter(Game.winner.isnot(None)).scalar()
             
-            # Update streak information
-            consecutive_wins = 4  # For undefeated achievement
-            stats.longest_win_streak = consecutive_wins
+            # Per-user totals, which also set the longest win streak
+            DatabaseManager._rebuild_user_stats(session)
             
             session.commit()
+            query_cache.invalidate()
             
-            return True
\ No newline at end of file
+            return True
+
+if __name__ == "__main__":
+    # python -m database.manager: rebuild user_stats after importing or editing games
+    print(f"Rebuilt stats for {DatabaseManager.rebuild_user_stats()} users")
@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index, func, select, delete, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import streamlit as st
+from .connection import PoolMonitor, create_db_engine
 
 # Create SQLAlchemy base class
 Base = declarative_base()
@@ -17,6 +18,7 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     games = relationship('Game', back_populates='user')
     achievements = relationship('UserAchievement', back_populates='user')
+    stats = relationship('UserStats', back_populates='user', uselist=False)
 
 class Game(Base):
     __tablename__ = 'games'
@@ -27,10 +29,19 @@ class Game(Base):
     moves_count = Column(Integer)
     duration = Column(Float)  # in seconds
     game_mode = Column(String)  # 'human' or 'bot'
-    difficulty = Column(String)  # 'easy', 'medium', 'hard', or None
+    difficulty = Column(String)  # 'easy', 'medium', 'hard', 'mcts', or None
     moves_history = Column(String)  # JSON string of moves
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship('User', back_populates='games')
+    
+    __table_args__ = (
+        # Per-user outcome counts
+        Index('ix_games_user_id_winner', 'user_id', 'winner'),
+        # A user's games in order, for rebuilding user_stats
+        Index('ix_games_user_id_created_at', 'user_id', 'created_at'),
+        # Recent games across all users
+        Index('ix_games_created_at', 'created_at'),
+    )
 
 class UserAchievement(Base):
     __tablename__ = 'user_achievements'
@@ -40,6 +51,28 @@ class UserAchievement(Base):
     achievement_id = Column(String)
     unlocked_at = Column(DateTime, default=datetime.utcnow)
     user = relationship('User', back_populates='achievements')
+    
+    __table_args__ = (
+        # A unique index rather than a constraint, so migrate() can add it to
+        # an existing SQLite table
+        Index('uq_user_achievements_user_id_achievement_id', 'user_id', 'achievement_id', unique=True),
+    )
+
+class UserStats(Base):
+    """Per-user totals, kept up to date by DatabaseManager.save_game"""
+    __tablename__ = 'user_stats'
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    total_games = Column(Integer, default=0, nullable=False)
+    wins = Column(Integer, default=0, nullable=False)
+    losses = Column(Integer, default=0, nullable=False)
+    draws = Column(Integer, default=0, nullable=False)
+    total_moves = Column(Integer, default=0, nullable=False)
+    total_time = Column(Float, default=0.0, nullable=False)  # in seconds
+    current_streak = Column(Integer, default=0, nullable=False)
+    longest_streak = Column(Integer, default=0, nullable=False)
+    fastest_win = Column(Float)  # in seconds
+    user = relationship('User', back_populates='stats')
 
 class GlobalStats(Base):
     __tablename__ = 'global_stats'
@@ -53,27 +86,61 @@ class GlobalStats(Base):
     fastest_win = Column(Float)  # in seconds
     longest_win_streak = Column(Integer, default=0)
 
+def migrate(engine):
+    """Bring a database up to the current schema; safe to run on every start.
+
+    create_all only creates missing tables, so indexes added to existing
+    tables are created here. Before the unique achievements index is added,
+    duplicate unlocks are removed, keeping the earliest.
+    """
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if table.name == UserAchievement.__tablename__ and index.unique:
+                    first = select(func.min(UserAchievement.id)).group_by(
+                        UserAchievement.user_id, UserAchievement.achievement_id
+                    )
+                    conn.execute(delete(UserAchievement).where(UserAchievement.id.not_in(first)))
+                index.create(conn)
+
 # Database connection and session management
-def init_db():
-    # Try to use DB_URL from Streamlit secrets. If connection fails (for example
-    # due to SSL/network issues), fall back to a local SQLite file so development
-    # and seeding can continue without a remote DB.
+LOCAL_DB_URL = "sqlite:///./dev.db"
+
+# Pool counters for the shared engine, see get_engine
+pool_monitor = PoolMonitor()
+
+@st.cache_resource
+def get_engine():
+    """The engine shared by every session of this server process.
+
+    Uses DB_URL from Streamlit secrets. If that is unset or the connection
+    fails (for example due to SSL/network issues), falls back to a local
+    SQLite file so development and seeding can continue without a remote DB.
+    """
     db_url = None
     try:
         db_url = st.secrets.get("DB_URL")
     except Exception:
         db_url = None
 
+    engine = None
     if db_url:
         try:
-            # Use pool_pre_ping to help recover stale connections
-            engine = create_engine(db_url, pool_pre_ping=True)
-            # Try a quick connect to verify availability
-            conn = engine.connect()
-            conn.close()
-            Base.metadata.create_all(engine)
-            return sessionmaker(bind=engine)
+            engine = create_db_engine(db_url)
+            # Attach before the first connection so every connect is counted
+            pool_monitor.attach(engine)
+            # Check availability; the connection goes back to the pool
+            with engine.connect():
+                pass
+            migrate(engine)
+            return engine
         except Exception as exc:
+            if engine is not None:
+                engine.dispose()
             # Inform the user (visible in Streamlit UI) and fall back
             try:
                 st.warning(f"Could not connect to DB at st.secrets['DB_URL']: {exc}. Falling back to local SQLite (dev.db) for development.")
@@ -82,16 +149,18 @@ def init_db():
                 pass
 
     # Fallback to local SQLite file for development/testing
-    local_url = "sqlite:///./dev.db"
-    engine = create_engine(local_url, connect_args={"check_same_thread": False})
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)
+    engine = create_db_engine(LOCAL_DB_URL)
+    pool_monitor.attach(engine)
+    migrate(engine)
+    return engine
 
-# Create session factory
-SessionFactory = None
+@st.cache_resource
+def init_db():
+    return sessionmaker(bind=get_engine())
 
 def get_db_session():
-    global SessionFactory
-    if SessionFactory is None:
-        SessionFactory = init_db()
-    return SessionFactory()
\ No newline at end of file
+    return init_db()()
+
+def get_pool_stats():
+    """Connection pool usage of the shared engine"""
+    return pool_monitor.stats()
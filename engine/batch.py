@@ -0,0 +1,74 @@
+"""Vectorized evaluation of many boards at once with NumPy.
+
+Boards are rows of an (N, 64) int8 array indexed like the bitboard cells
+(z * 16 + y * 4 + x), holding EMPTY, X_CELL or O_CELL. Each cell is mapped to
+a code (1 for X, 5 for O) so that the sum over a line's four cells, gathered
+through the (76, 4) LINE_INDEX array, is x_count + 5 * o_count. One table
+lookup then gives every line's score, and a row sum the board's, matching
+Board.score. Large batches are processed in chunks small enough for the
+(chunk, 76, 4) intermediates to stay in cache, which is about twice as fast
+as one pass over the whole array.
+"""
+
+import numpy as np
+
+from engine.bitboard import CELLS, LINES, LINE_SCORES, SIZE, X, O
+
+EMPTY, X_CELL, O_CELL = 0, X + 1, O + 1
+
+# Cell indexes of every winning line, one row per line id
+LINE_INDEX = np.array(LINES, dtype=np.intp)
+
+_CELL_CODES = np.array([0, 1, SIZE + 1], dtype=np.int8)
+
+# Boards per chunk
+CHUNK = 4096
+
+# Line score by x_count + 5 * o_count; every line score fits in an int8
+_LINE_SCORE_TABLE = np.zeros((SIZE + 1) ** 2, dtype=np.int8)
+for _x in range(SIZE + 1):
+    for _o in range(SIZE + 1 - _x):
+        _LINE_SCORE_TABLE[_x + (SIZE + 1) * _o] = LINE_SCORES[_x][_o]
+
+
+def boards_to_array(boards):
+    """Stack Board objects into an (N, 64) int8 array"""
+    array = np.zeros((len(boards), CELLS), dtype=np.int8)
+    for row, board in zip(array, boards):
+        for index, side in board.history:
+            row[index] = side + 1
+    return array
+
+
+def line_counts(boards):
+    """Return (x_counts, o_counts), each (N, 76), for an (N, 64) board array"""
+    boards = _check(boards)
+    sums = np.empty((len(boards), len(LINES)), dtype=np.int8)
+    for start in range(0, len(boards), CHUNK):
+        sums[start:start + CHUNK] = _line_sums(boards[start:start + CHUNK])
+    return sums % (SIZE + 1), sums // (SIZE + 1)
+
+
+def evaluate_boards(boards):
+    """Heuristic scores from O's point of view for an (N, 64) board array.
+
+    Returns an (N,) int32 array equal to Board.score for each row.
+    """
+    boards = _check(boards)
+    scores = np.empty(len(boards), dtype=np.int32)
+    for start in range(0, len(boards), CHUNK):
+        sums = _line_sums(boards[start:start + CHUNK])
+        scores[start:start + CHUNK] = _LINE_SCORE_TABLE[sums].sum(axis=1, dtype=np.int32)
+    return scores
+
+
+def _check(boards):
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim != 2 or boards.shape[1] != CELLS:
+        raise ValueError(f"expected an (N, {CELLS}) board array, got shape {boards.shape}")
+    return boards
+
+
+def _line_sums(boards):
+    """x_count + 5 * o_count for every line of every board, shape (N, 76)"""
+    return _CELL_CODES[boards][:, LINE_INDEX].sum(axis=2, dtype=np.int8)
@@ -0,0 +1,187 @@
+"""Headless bot-vs-bot matches for measuring the engine.
+
+Each match plays a number of games between two difficulty levels, one game
+per seed. The seed drives the random moves the levels' smart_rate calls for,
+so runs are repeatable apart from where timed searches happen to stop.
+Results are printed as JSON, so runs can be stored and compared:
+
+    python -m engine.benchmark --games 4 --output bench.json
+    python -m engine.benchmark --levels easy medium --cross
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from engine import book, bot, parallel, search
+from engine.mcts import TreeCache
+from engine.bitboard import Board, CELLS, PLAYERS, SIDE, cell_index
+from engine.transposition import TranspositionTable
+
+
+def _as_o(board):
+    """The same position with the sides swapped, so X's move can be chosen as O's"""
+    swapped = Board()
+    for index, side in board.history:
+        swapped.play(index, 1 - side)
+    return swapped
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * pct // 100)]
+
+
+def play_game(x_level, o_level, seed, opening_book=None, pool=None):
+    """Play one game and return its winner ('X', 'O' or None) and per-move records"""
+    rng = random.Random(seed)
+    board = Board()
+    levels = {'X': search.DIFFICULTY_LEVELS[x_level], 'O': search.DIFFICULTY_LEVELS[o_level]}
+    tables = {'X': TranspositionTable(), 'O': TranspositionTable()}
+    trees = {'X': TreeCache(), 'O': TreeCache()}
+    moves = []
+    for ply in range(CELLS):
+        player = PLAYERS[ply % 2]
+        level = levels[player]
+        if rng.random() >= level['smart_rate']:
+            move = rng.choice(board.empty_cells())
+            record = {'source': 'random', 'nodes': 0, 'depth': 0, 'ms': 0.0}
+        else:
+            position = board if player == 'O' else _as_o(board)
+            record = {}
+            move = bot.choose_smart_move(
+                position, level, opening_book, tables[player], pool=pool, stats=record, trees=trees[player]
+            )
+        record['player'] = player
+        record['engine'] = level['engine']
+        moves.append(record)
+
+        board.play(cell_index(*move), SIDE[player])
+        if board.last_move_wins() is not None:
+            return player, moves
+    return None, moves
+
+
+def run_match(x_level, o_level, seeds, opening_book=None, pool=None):
+    """Play one game per seed and summarize results and speed"""
+    wins = {'X': 0, 'O': 0}
+    draws = 0
+    plies = 0
+    move_ms = []
+    search_ms = 0.0
+    nodes = 0
+    # MCTS counts simulations as nodes, so they are summed apart
+    mcts_ms = 0.0
+    simulations = 0
+    sources = {'book': 0, 'threats': 0, 'search': 0, 'random': 0}
+    for seed in seeds:
+        winner, moves = play_game(x_level, o_level, seed, opening_book, pool)
+        if winner:
+            wins[winner] += 1
+        else:
+            draws += 1
+        plies += len(moves)
+        for record in moves:
+            sources[record['source']] += 1
+            if record['source'] == 'random':
+                continue
+            move_ms.append(record['ms'])
+            if record['source'] != 'search':
+                continue
+            if record['engine'] == 'mcts':
+                mcts_ms += record['ms']
+                simulations += record['nodes']
+            else:
+                search_ms += record['ms']
+                nodes += record['nodes']
+
+    games = len(seeds)
+    return {
+        'x': x_level,
+        'o': o_level,
+        'games': games,
+        'x_wins': wins['X'],
+        'o_wins': wins['O'],
+        'draws': draws,
+        'x_win_rate': wins['X'] / games,
+        'o_win_rate': wins['O'] / games,
+        'draw_rate': draws / games,
+        'avg_plies': plies / games,
+        'move_sources': sources,
+        'smart_moves': len(move_ms),
+        'move_ms_p50': round(_percentile(move_ms, 50), 2),
+        'move_ms_p99': round(_percentile(move_ms, 99), 2),
+        'moves_per_sec': round(len(move_ms) / (sum(move_ms) / 1000), 2) if sum(move_ms) else 0.0,
+        'nodes': nodes,
+        'nodes_per_sec': round(nodes / (search_ms / 1000)) if search_ms else 0,
+        'simulations': simulations,
+        'sims_per_sec': round(simulations / (mcts_ms / 1000)) if mcts_ms else 0,
+    }
+
+
+def run_benchmark(levels, seeds, cross=False, opening_book=None, pool=None, progress=None):
+    """Run a match for each level against itself, or for every pair if cross"""
+    pairs = [(x, o) for x in levels for o in levels] if cross else [(level, level) for level in levels]
+    matches = []
+    for x_level, o_level in pairs:
+        start = time.perf_counter()
+        match = run_match(x_level, o_level, seeds, opening_book, pool)
+        match['wall_sec'] = round(time.perf_counter() - start, 2)
+        matches.append(match)
+        if progress:
+            progress(match)
+    return {
+        'levels': {level: search.DIFFICULTY_LEVELS[level] for level in levels},
+        'seeds': list(seeds),
+        'book_positions': len(opening_book) if opening_book is not None else 0,
+        'parallel': pool is not None,
+        'matches': matches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot with headless bot-vs-bot matches")
+    parser.add_argument('--levels', nargs='+', default=list(search.DIFFICULTY_LEVELS),
+                        choices=list(search.DIFFICULTY_LEVELS), help="difficulty levels to play")
+    parser.add_argument('--games', type=int, default=4, help="games per match, seeded 0, 1, 2, ...")
+    parser.add_argument('--seed', type=int, default=0, help="first seed")
+    parser.add_argument('--cross', action='store_true', help="play every pair of levels, not just mirrors")
+    parser.add_argument('--no-book', action='store_true', help="do not use the opening book")
+    parser.add_argument('--parallel', action='store_true', help="use a process pool for parallel levels")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    opening_book = None if args.no_book else book.load_book()
+    pool = None
+    if args.parallel:
+        pool = parallel.ParallelSearch()
+
+    def progress(match):
+        speed = f"{match['nodes_per_sec']} nodes/s"
+        if match['simulations']:
+            speed += f", {match['sims_per_sec']} sims/s"
+        print(f"{match['x']} vs {match['o']}: X {match['x_wins']} / O {match['o_wins']} / draw {match['draws']}, "
+              f"p50 {match['move_ms_p50']} ms, {speed}, {match['wall_sec']}s",
+              file=sys.stderr)
+
+    seeds = range(args.seed, args.seed + args.games)
+    try:
+        report = run_benchmark(args.levels, seeds, args.cross, opening_book, pool, progress)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""Bitboard representation of the 4x4x4 board.
+
+Each player's pieces are stored in one 64-bit integer. Cell (z, y, x) maps to
+bit ``z * 16 + y * 4 + x``, so a winning line is a mask with four bits set and
+a win check is a single AND per line.
+"""
+
+import random
+import struct
+from itertools import permutations, product
+
+SIZE = 4
+CELLS = SIZE ** 3
+FULL_MASK = (1 << CELLS) - 1
+
+# Side indexes used by the bitboard; the UI keeps using 'X' and 'O'
+PLAYERS = ('X', 'O')
+X, O = 0, 1
+SIDE = {'X': X, 'O': O}
+
+# One representative per direction (the opposite direction gives the same lines),
+# ordered axis steps first, then face diagonals, then space diagonals
+DIRECTIONS = sorted(
+    (
+        (dz, dy, dx)
+        for dz in (-1, 0, 1) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+        if (dz, dy, dx) > (0, 0, 0)
+    ),
+    key=lambda d: sum(map(abs, d))
+)
+
+
+def cell_index(z, y, x):
+    return (z << 4) | (y << 2) | x
+
+
+def cell_coords(index):
+    return index >> 4, (index >> 2) & 3, index & 3
+
+
+def _build_lines():
+    """Enumerate the 76 winning lines as tuples of cell indexes"""
+    lines = []
+    for dz, dy, dx in DIRECTIONS:
+        for z in range(SIZE):
+            for y in range(SIZE):
+                for x in range(SIZE):
+                    end = (z + 3 * dz, y + 3 * dy, x + 3 * dx)
+                    if not all(0 <= c < SIZE for c in end):
+                        continue
+                    # Only keep lines that start on the board edge
+                    prev = (z - dz, y - dy, x - dx)
+                    if all(0 <= c < SIZE for c in prev):
+                        continue
+                    lines.append(tuple(cell_index(z + k * dz, y + k * dy, x + k * dx) for k in range(SIZE)))
+    return lines
+
+
+LINES = _build_lines()
+LINE_MASKS = [sum(1 << i for i in line) for line in LINES]
+
+# Line kind by how many coordinates change along it: 'axis', 'face' or 'space'
+LINE_KINDS = [
+    ('axis', 'face', 'space')[sum(a != b for a, b in zip(cell_coords(line[0]), cell_coords(line[1]))) - 1]
+    for line in LINES
+]
+
+# For each cell, the ids of the lines through it (4 to 7 of them)
+CELL_LINES = [
+    tuple(line_id for line_id, line in enumerate(LINES) if index in line)
+    for index in range(CELLS)
+]
+
+assert len(LINES) == 76
+
+
+def line_score(x_count, o_count):
+    """Heuristic value of one line from O's point of view"""
+    if x_count and o_count:
+        return 0
+    if o_count == 3:
+        return 100
+    elif x_count == 3:
+        return -100
+    elif o_count == 2:
+        return 10
+    elif x_count == 2:
+        return -10
+    elif o_count == 1:
+        return 1
+    elif x_count == 1:
+        return -1
+    return 0
+
+
+# LINE_SCORES[x_count][o_count]; completed lines are wins and scored by the search
+LINE_SCORES = [[line_score(x, o) for o in range(SIZE + 1)] for x in range(SIZE + 1)]
+
+# Zobrist keys: one random 64-bit number per (side, cell), fixed seed so hashes
+# are stable across processes
+_rng = random.Random(0x3D7)
+ZOBRIST = [[_rng.getrandbits(64) for _ in range(CELLS)] for _ in PLAYERS]
+ZOBRIST_SIDE = _rng.getrandbits(64)
+
+
+def _build_symmetries():
+    """The 48 rotations and reflections of the cube as cell permutations.
+
+    SYMMETRIES[s][i] is the cell that cell i moves to under symmetry s; the
+    identity comes first.
+    """
+    symmetries = []
+    for axes in permutations(range(3)):
+        for flips in product((False, True), repeat=3):
+            perm = []
+            for index in range(CELLS):
+                coords = cell_coords(index)
+                moved = [coords[axis] for axis in axes]
+                perm.append(cell_index(*(SIZE - 1 - c if flip else c for c, flip in zip(moved, flips))))
+            symmetries.append(tuple(perm))
+    return symmetries
+
+
+SYMMETRIES = _build_symmetries()
+INVERSE_SYMMETRIES = [tuple(sorted(range(CELLS), key=perm.__getitem__)) for perm in SYMMETRIES]
+
+# SYM_ZOBRIST[side][index] packs the key of that piece under each of the 48
+# symmetries into one integer (64 bits per symmetry, identity lowest), so a
+# board keeps the hashes of all 48 images of itself with a single XOR
+SYM_ZOBRIST = [
+    [sum(ZOBRIST[side][perm[index]] << (64 * s) for s, perm in enumerate(SYMMETRIES)) for index in range(CELLS)]
+    for side in range(len(PLAYERS))
+]
+_unpack_sym_hashes = struct.Struct(f'<{len(SYMMETRIES)}Q').unpack
+_SYM_HASH_BYTES = 8 * len(SYMMETRIES)
+_HASH_MASK = (1 << 64) - 1
+
+assert len(SYMMETRIES) == 48
+assert all(
+    sorted(tuple(sorted(perm[i] for i in line)) for line in LINES) == sorted(tuple(sorted(line)) for line in LINES)
+    for perm in SYMMETRIES
+)
+
+
+class Board:
+    """A 4x4x4 board backed by two 64-bit integers, one per player"""
+
+    __slots__ = ('bits', 'history', 'counts', 'score', 'sym_hash')
+
+    def __init__(self):
+        self.bits = [0, 0]
+        self.history = []
+        # Pieces per line for each side, and the sum of LINE_SCORES over all
+        # 76 lines, both kept up to date by play() and undo()
+        self.counts = [[0] * len(LINES), [0] * len(LINES)]
+        self.score = 0
+        # Zobrist hashes of the board under all 48 symmetries, packed
+        self.sym_hash = 0
+
+    @classmethod
+    def from_moves(cls, moves):
+        """Build a board from (z, y, x, player) tuples"""
+        board = cls()
+        for z, y, x, player in moves:
+            board.make_move(z, y, x, player)
+        return board
+
+    def copy(self):
+        board = Board()
+        board.bits = self.bits[:]
+        board.history = self.history[:]
+        board.counts = [self.counts[X][:], self.counts[O][:]]
+        board.score = self.score
+        board.sym_hash = self.sym_hash
+        return board
+
+    def __getitem__(self, key):
+        """Return 'X', 'O' or '' for board[z, y, x], like the old object array"""
+        bit = 1 << cell_index(*key)
+        if self.bits[X] & bit:
+            return 'X'
+        if self.bits[O] & bit:
+            return 'O'
+        return ''
+
+    @property
+    def hash(self):
+        return self.sym_hash & _HASH_MASK
+
+    def canonical(self):
+        """Return (key, symmetry) for the canonical form of this position.
+
+        key is the same for all 48 orientations of a position, and symmetry
+        maps cells of this board onto that canonical orientation.
+        """
+        hashes = _unpack_sym_hashes(self.sym_hash.to_bytes(_SYM_HASH_BYTES, 'little'))
+        key = min(hashes)
+        return key, hashes.index(key)
+
+    @property
+    def occupied(self):
+        return self.bits[X] | self.bits[O]
+
+    def is_empty(self, z, y, x):
+        return not (self.occupied >> cell_index(z, y, x)) & 1
+
+    def is_full(self):
+        return self.occupied == FULL_MASK
+
+    # -- Index-level operations used by the search --
+
+    def play(self, index, side):
+        self.bits[side] |= 1 << index
+        self.sym_hash ^= SYM_ZOBRIST[side][index]
+        self.history.append((index, side))
+        x_counts, o_counts = self.counts
+        score = self.score
+        for line_id in CELL_LINES[index]:
+            x_count = x_counts[line_id]
+            o_count = o_counts[line_id]
+            score -= LINE_SCORES[x_count][o_count]
+            if side == X:
+                x_count += 1
+                x_counts[line_id] = x_count
+            else:
+                o_count += 1
+                o_counts[line_id] = o_count
+            score += LINE_SCORES[x_count][o_count]
+        self.score = score
+
+    def undo(self):
+        index, side = self.history.pop()
+        self.bits[side] &= ~(1 << index)
+        self.sym_hash ^= SYM_ZOBRIST[side][index]
+        x_counts, o_counts = self.counts
+        score = self.score
+        for line_id in CELL_LINES[index]:
+            x_count = x_counts[line_id]
+            o_count = o_counts[line_id]
+            score -= LINE_SCORES[x_count][o_count]
+            if side == X:
+                x_count -= 1
+                x_counts[line_id] = x_count
+            else:
+                o_count -= 1
+                o_counts[line_id] = o_count
+            score += LINE_SCORES[x_count][o_count]
+        self.score = score
+        return index, side
+
+    def empty_indices(self):
+        free = ~self.occupied & FULL_MASK
+        indices = []
+        while free:
+            low = free & -free
+            indices.append(low.bit_length() - 1)
+            free ^= low
+        return indices
+
+    def side_wins(self, side):
+        bits = self.bits[side]
+        for mask in LINE_MASKS:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def winning_line_at(self, index, side):
+        """Return the id of a line through index that side has completed, or None"""
+        bits = self.bits[side]
+        for line_id in CELL_LINES[index]:
+            mask = LINE_MASKS[line_id]
+            if bits & mask == mask:
+                return line_id
+        return None
+
+    def last_move_wins(self):
+        """Return the line completed by the last move, or None.
+
+        Only the player who just moved can have made a new line, and only
+        through the cell they played, so this checks at most 7 lines.
+        """
+        if not self.history:
+            return None
+        index, side = self.history[-1]
+        return self.winning_line_at(index, side)
+
+    # -- Coordinate-level operations used by the UI --
+
+    def make_move(self, z, y, x, player):
+        if not self.is_empty(z, y, x):
+            raise ValueError(f"Cell ({z}, {y}, {x}) is already taken")
+        self.play(cell_index(z, y, x), SIDE[player])
+
+    def undo_move(self):
+        index, side = self.undo()
+        return (*cell_coords(index), PLAYERS[side])
+
+    def winner(self):
+        """Return 'X' or 'O' if that player has four in a row, else None"""
+        for side in (X, O):
+            if self.side_wins(side):
+                return PLAYERS[side]
+        return None
+
+    def empty_cells(self):
+        return [cell_coords(i) for i in self.empty_indices()]
+
+
+def line_cells(line_id):
+    """Return the (z, y, x) cells of a winning line"""
+    return [cell_coords(i) for i in LINES[line_id]]
@@ -0,0 +1,122 @@
+"""Opening book for the bot's first moves.
+
+The book maps canonical positions (see Board.canonical) with O to move to the
+move a fixed-depth search chose, stored in the canonical orientation. It is
+built offline and saved as a compact binary file:
+
+    header: magic b'3DTB', format version, search depth, entry count
+    entries: 64-bit canonical key, 1-byte canonical cell index
+
+Rebuild it whenever the engine improves:
+
+    python -m engine.book --moves 2 --depth 4
+"""
+
+import argparse
+import os
+import struct
+import time
+
+from engine.bitboard import Board, O, X, SYMMETRIES, INVERSE_SYMMETRIES, cell_coords
+from engine.search import SearchContext, search_root
+from engine.transposition import TranspositionTable
+
+MAGIC = b'3DTB'
+VERSION = 1
+HEADER = struct.Struct('<4sBBI')
+ENTRY = struct.Struct('<QB')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+class OpeningBook:
+    """Book moves by canonical position, searched to a fixed depth"""
+
+    def __init__(self, moves=None, depth=0):
+        self.moves = moves or {}
+        self.depth = depth
+
+    def __len__(self):
+        return len(self.moves)
+
+    def lookup(self, board):
+        """Return the book (z, y, x) move for O on board, or None"""
+        if not self.moves:
+            return None
+        key, symmetry = board.canonical()
+        move = self.moves.get(key)
+        if move is None:
+            return None
+        return cell_coords(INVERSE_SYMMETRIES[symmetry][move])
+
+    def save(self, path=DEFAULT_PATH):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.depth, len(self.moves)))
+            for key, move in sorted(self.moves.items()):
+                f.write(ENTRY.pack(key, move))
+
+
+def load_book(path=DEFAULT_PATH):
+    """Load a book file; a missing file gives an empty book"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return OpeningBook()
+    magic, version, depth, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} opening book")
+    body = data[HEADER.size:HEADER.size + count * ENTRY.size]
+    return OpeningBook(dict(ENTRY.iter_unpack(body)), depth)
+
+
+def build_book(moves, depth, progress=None):
+    """Search every position where O makes one of its first `moves` moves.
+
+    X may play any cell, while O only plays the book move, so each level
+    multiplies the positions by the number of distinct X replies.
+    """
+    book = OpeningBook(depth=depth)
+    table = TranspositionTable(max_entries=1_000_000)
+    frontier = [Board()]
+    for _ in range(moves):
+        next_frontier = []
+        for board in frontier:
+            seen = set()
+            for index in board.empty_indices():
+                board.play(index, X)
+                key, symmetry = board.canonical()
+                if key not in seen and key not in book.moves:
+                    seen.add(key)
+                    _, move = search_root(board, depth, SearchContext(table))
+                    book.moves[key] = SYMMETRIES[symmetry][move]
+                    child = board.copy()
+                    child.play(move, O)
+                    next_frontier.append(child)
+                    if progress:
+                        progress(len(book.moves))
+                board.undo()
+        frontier = next_frontier
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the bot's opening book")
+    parser.add_argument('--moves', type=int, default=2, help="number of O moves to cover")
+    parser.add_argument('--depth', type=int, default=4, help="search depth for each book move")
+    parser.add_argument('--output', default=DEFAULT_PATH, help="where to write the book")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(count):
+        if count % 50 == 0:
+            print(f"{count} positions, {time.perf_counter() - start:.0f}s")
+
+    book = build_book(args.moves, args.depth, progress)
+    book.save(args.output)
+    print(f"Wrote {len(book)} positions at depth {args.depth} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
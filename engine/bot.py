@@ -0,0 +1,53 @@
+"""Bot move selection, independent of the Streamlit session.
+
+Everything the bot needs is passed in, so a move can be computed on a
+background thread while the page keeps responding.
+"""
+
+import time
+
+from engine import mcts, search, threats
+
+
+def choose_smart_move(board, level, opening_book=None, table=None, root_cache=None, pool=None, stop=None,
+                      stats=None, trees=None):
+    """Pick O's (z, y, x) move from the opening book, a forced win, or a search.
+
+    level is an entry of search.DIFFICULTY_LEVELS. pool, if given, is an
+    engine.parallel.ParallelSearch used for levels marked parallel, and
+    trees an engine.mcts.TreeCache for MCTS levels. Setting the stop event
+    ends the search early with the best move found so far.
+    stats, if given, is a dict that receives where the move came from
+    ('book', 'threats' or 'search'), the wall time in ms and the search's
+    counters (see SearchContext.report).
+    """
+    start = time.perf_counter()
+    if stats is None:
+        stats = {}
+    stats.update(search.SearchContext().report(0), source='search')
+    move = _choose(board, level, opening_book, table, root_cache, pool, stop, stats, trees)
+    stats['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return move
+
+
+def _choose(board, level, opening_book, table, root_cache, pool, stop, stats, trees):
+    # Book moves are only as deep as the book was built, so weaker levels search
+    if opening_book is not None and level['max_depth'] >= opening_book.depth:
+        move = opening_book.lookup(board)
+        if move:
+            stats['source'] = 'book'
+            return move
+
+    # A forced win from consecutive threes is cheaper to find than to search for
+    sequence = threats.find_forced_win(board, 'O', level['threat_depth'])
+    if sequence:
+        stats['source'] = 'threats'
+        return sequence[0][:3]
+
+    if level['engine'] == 'mcts':
+        return mcts.make_mcts_move(
+            board, level['simulations'], level['time_ms'], stop, trees, level['heavy_playouts'], stats=stats
+        )
+    if level['parallel'] and pool is not None:
+        return pool.make_timed_move(board, level['time_ms'], level['max_depth'], root_cache, stop, stats)
+    return search.make_timed_move(board, level['time_ms'], level['max_depth'], table, root_cache, stop, stats)
@@ -0,0 +1,232 @@
+"""Monte Carlo tree search (UCT) for the bot, played as O against X.
+
+The tree is grown one node per simulation and scored by playouts to the end
+of the game. Playouts work on the two raw bitmasks instead of a Board.
+Random playouts play uniformly random cells. Heavy playouts also take an
+immediate win, or block the opponent's, whenever one is available, which
+makes their results far less noisy for little extra cost.
+
+The search is anytime: it stops at the simulation budget, the time limit or
+the stop event, whichever comes first, and plays the most visited move.
+Between consecutive moves of a game the subtree under the chosen move is
+kept in a TreeCache, so the next search starts from the statistics already
+gathered for the opponent's reply.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from engine.bitboard import CELL_LINES, FULL_MASK, LINE_MASKS, O, X, ZOBRIST, cell_coords
+
+# Exploration constant for UCB1
+EXPLORATION = 1.0
+
+# Line masks through each cell, for win and threat checks after a move
+CELL_MASKS = [[LINE_MASKS[line_id] for line_id in lines] for lines in CELL_LINES]
+
+# Cells on more lines (the corners and the centre) are expanded first
+CELL_WEIGHTS = [len(lines) for lines in CELL_LINES]
+
+
+class _Node:
+    __slots__ = ('move', 'side', 'won', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move=None, side=X, won=False):
+        # The cell played to reach this node, by side, and whether it won
+        self.move = move
+        self.side = side
+        self.won = won
+        self.children = []
+        # Moves not expanded yet; None until the node is first expanded
+        self.untried = None
+        self.visits = 0
+        # Playout results for side: 1 per win, 0.5 per draw
+        self.wins = 0.0
+
+
+class TreeCache:
+    """Subtrees kept between moves, by the identity hash of their position"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.trees = OrderedDict()
+        self.lock = threading.Lock()
+
+    def put(self, key, node):
+        with self.lock:
+            self.trees[key] = node
+            self.trees.move_to_end(key)
+            while len(self.trees) > self.max_entries:
+                self.trees.popitem(last=False)
+
+    def take(self, key):
+        """Remove and return the subtree for key, so only one search grows it"""
+        with self.lock:
+            return self.trees.pop(key, None)
+
+    def __len__(self):
+        return len(self.trees)
+
+
+def _indices(bits):
+    indices = []
+    while bits:
+        low = bits & -bits
+        indices.append(low.bit_length() - 1)
+        bits ^= low
+    return indices
+
+
+def _wins(own, index):
+    for mask in CELL_MASKS[index]:
+        if own & mask == mask:
+            return True
+    return False
+
+
+def _add_threats(threats, own, opp, masks):
+    """Add the cells that would complete one of masks for own"""
+    for mask in masks:
+        if not opp & mask:
+            rest = mask & ~own
+            if rest and not rest & (rest - 1):
+                threats |= rest
+    return threats
+
+
+def _playout(bits, side, rng, heavy):
+    """Play the game out from bits with side to move; return the winner or None"""
+    bits = bits[:]
+    free = FULL_MASK & ~(bits[X] | bits[O])
+    cells = _indices(free)
+    rng.shuffle(cells)
+    position = 0
+    if heavy:
+        threats = [_add_threats(0, bits[X], bits[O], LINE_MASKS), _add_threats(0, bits[O], bits[X], LINE_MASKS)]
+
+    while free:
+        if heavy:
+            if threats[side] & free:
+                return side
+            block = threats[1 - side] & free
+            if block:
+                index = (block & -block).bit_length() - 1
+            else:
+                while not free >> cells[position] & 1:
+                    position += 1
+                index = cells[position]
+            bits[side] |= 1 << index
+            threats[side] = _add_threats(threats[side], bits[side], bits[1 - side], CELL_MASKS[index])
+        else:
+            while not free >> cells[position] & 1:
+                position += 1
+            index = cells[position]
+            bits[side] |= 1 << index
+            if _wins(bits[side], index):
+                return side
+        free &= ~(1 << index)
+        side = 1 - side
+    return None
+
+
+def _select(node):
+    log_visits = math.log(node.visits)
+    best, best_value = None, -1.0
+    for child in node.children:
+        value = child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+        if value > best_value:
+            best, best_value = child, value
+    return best
+
+
+def _reuse(board, trees):
+    """Find the subtree kept from our last move, below the opponent's reply"""
+    if trees is None or len(board.history) < 2:
+        return None
+    index, side = board.history[-1]
+    node = trees.take(board.hash ^ ZOBRIST[side][index])
+    if node is None:
+        return None
+    for child in node.children:
+        if child.move == index:
+            return child
+    return None
+
+
+def make_mcts_move(board, simulations, time_ms, stop=None, trees=None, heavy=True, rng=None, stats=None):
+    """Return O's (z, y, x) move after up to `simulations` playouts or time_ms.
+
+    trees, if given, is a TreeCache that carries the search tree from one
+    move of a game to the next. stats, if given, is a dict that receives the
+    simulations run (as nodes), the tree nodes added (as expanded), the
+    deepest tree ply reached (as depth) and the visits reused from the
+    previous move.
+    """
+    rng = rng or random.Random()
+    root = _reuse(board, trees) or _Node(side=X)
+    reused = root.visits
+    root_bits = board.bits[:]
+    deadline = time.perf_counter() + time_ms / 1000
+    expanded = 0
+    max_ply = 0
+
+    for simulation in range(simulations):
+        if simulation % 16 == 0 and simulation:
+            if time.perf_counter() > deadline or (stop is not None and stop.is_set()):
+                break
+
+        node = root
+        path = [node]
+        bits = root_bits[:]
+        side = O
+        # Selection: descend through fully expanded nodes
+        while not node.won and node.untried == [] and node.children:
+            node = _select(node)
+            bits[side] |= 1 << node.move
+            side = 1 - side
+            path.append(node)
+
+        # Expansion: add one untried move
+        if not node.won:
+            if node.untried is None:
+                node.untried = _indices(FULL_MASK & ~(bits[X] | bits[O]))
+                rng.shuffle(node.untried)
+                node.untried.sort(key=CELL_WEIGHTS.__getitem__)
+            if node.untried:
+                move = node.untried.pop()
+                bits[side] |= 1 << move
+                node = _Node(move, side, _wins(bits[side], move))
+                path[-1].children.append(node)
+                path.append(node)
+                side = 1 - side
+                expanded += 1
+
+        # Simulation
+        if node.won:
+            winner = node.side
+        elif node.untried == [] and not node.children:
+            winner = None
+        else:
+            winner = _playout(bits, side, rng, heavy)
+        max_ply = max(max_ply, len(path) - 1)
+
+        # Backpropagation, each node scored for the side that moved into it
+        for node in path:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.side:
+                node.wins += 1
+
+    best = max(root.children, key=lambda child: child.visits)
+    if trees is not None:
+        trees.put(board.hash ^ ZOBRIST[O][best.move], best)
+    if stats is not None:
+        stats.update(
+            nodes=root.visits - reused, cutoffs=0, tt_hits=0, expanded=expanded, depth=max_ply, branching=0.0,
+            reused=reused
+        )
+    return cell_coords(best.move)
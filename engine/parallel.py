@@ -0,0 +1,306 @@
+"""Parallel root search over a process pool.
+
+Root moves are spread over worker processes. The first, best-ordered root
+move is searched alone before the others, young-brothers-wait style, so its
+score can be passed to the rest as alpha. Workers also publish better scores
+in a shared array, so every root move starts from the best score known so
+far. Each worker keeps its own transposition table between tasks. A pool
+kept alive across reruns therefore also keeps warm tables.
+
+Workers are started with forkserver (spawn where that is missing), never
+by forking the multithreaded server process. Every search holds a token in
+shared memory; when the search ends or is stopped the token is withdrawn,
+and the worker tasks still running for it stop at their next node. If a
+worker dies the pool is rebuilt and that move is searched serially.
+"""
+
+import contextlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from engine import search
+from engine.bitboard import Board, O, SYMMETRIES, INVERSE_SYMMETRIES, cell_coords
+from engine.search import SearchContext, SearchTimeout, WIN_THRESHOLD, minimax, order_moves, search_root
+from engine.transposition import TranspositionTable, EXACT
+
+logger = logging.getLogger(__name__)
+
+# Searches that can share the pool at once, one alpha slot each
+MAX_SEARCHES = 64
+
+# Seconds to wait for every worker process to start
+STARTUP_TIMEOUT = 60
+
+# Seconds between stop checks while waiting for a worker's result
+STOP_POLL = 0.05
+
+# Set in each worker process by _init_worker
+_shared_alphas = None
+_shared_tokens = None
+_worker_table = None
+
+# Stands in for the parent's __main__ while workers start, see _hidden_main
+_WORKER_MAIN = types.ModuleType('__main__')
+_launch_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _hidden_main():
+    """Keep new worker processes from re-running the parent's __main__.
+
+    spawn and forkserver workers import the parent's __main__ module as
+    __mp_main__. Under Streamlit that is the app script, so while workers
+    start __main__ is swapped for an empty module, the guard the app script
+    itself cannot have.
+    """
+    with _launch_lock:
+        main = sys.modules.get('__main__')
+        sys.modules['__main__'] = _WORKER_MAIN
+        try:
+            yield
+        finally:
+            # Streamlit may have installed a new script module meanwhile; keep it
+            if sys.modules.get('__main__') is _WORKER_MAIN:
+                sys.modules['__main__'] = main
+
+
+def _init_worker(shared_alphas, shared_tokens, started):
+    global _shared_alphas, _shared_tokens, _worker_table
+    _shared_alphas = shared_alphas
+    _shared_tokens = shared_tokens
+    _worker_table = TranspositionTable()
+    # Hold every worker until all have started, so the pool is complete
+    # before ParallelSearch leaves _hidden_main
+    started.wait(STARTUP_TIMEOUT)
+
+
+def _ready():
+    return True
+
+
+class _SearchToken:
+    """The worker side of a search's stop event: set once the parent has
+    withdrawn the token from the search's slot"""
+
+    def __init__(self, slot, token):
+        self.slot = slot
+        self.token = token
+
+    def is_set(self):
+        return _shared_tokens[self.slot] != self.token
+
+
+def _search_root_move(history, index, depth, alpha, slot, token, deadline):
+    """Worker task: return (score, search counters) for O's root move index
+    after the moves in history.
+
+    deadline is a time.perf_counter() value, which is system-wide on the
+    platforms we run on, so it means the same in every process.
+    """
+    board = Board()
+    for cell, side in history:
+        board.play(cell, side)
+    board.play(index, O)
+
+    alpha = max(alpha, _shared_alphas[slot])
+    context = SearchContext(_worker_table, deadline, _SearchToken(slot, token))
+    score = minimax(board, depth, False, alpha, float('inf'), context)
+
+    with _shared_alphas.get_lock():
+        if score > _shared_alphas[slot]:
+            _shared_alphas[slot] = score
+    return score, context.counters()
+
+
+class ParallelSearch:
+    """A warm process pool that searches the root moves of a position in parallel"""
+
+    def __init__(self, workers=None):
+        # Forking a process that runs server and search threads can deadlock
+        # the child, so workers come from a forkserver that preloads the engine
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.mp_context = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            self.mp_context.set_forkserver_preload(['engine.parallel'])
+        self.workers = workers or os.cpu_count()
+        self.alphas = self.mp_context.Array('d', MAX_SEARCHES)
+        # The token of the search holding each slot; 0 while the slot is free
+        self.tokens = self.mp_context.RawArray('q', MAX_SEARCHES)
+        self.next_token = itertools.count(1)
+        self.slots = queue.Queue()
+        for slot in range(MAX_SEARCHES):
+            self.slots.put(slot)
+        self.lock = threading.Lock()
+        self.executor = self._start_executor()
+
+    def _start_executor(self):
+        """A pool with all its workers running"""
+        started = self.mp_context.Barrier(self.workers)
+        with _hidden_main():
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self.mp_context,
+                initializer=_init_worker,
+                initargs=(self.alphas, self.tokens, started)
+            )
+            # Each submit starts a worker while none is idle, and none is idle
+            # until all have passed the barrier, so this starts all of them
+            for future in [executor.submit(_ready) for _ in range(self.workers)]:
+                future.result()
+        return executor
+
+    def _restart(self, broken):
+        """Replace the executor if it is still the broken one"""
+        with self.lock:
+            if self.executor is not broken:
+                return
+            logger.warning("parallel search pool broke; starting a new one")
+            # Python 3.11 can leave a broken pool's other workers running when
+            # its cleanup meets a future we cancelled, so stop them here
+            processes = list((broken._processes or {}).values())
+            broken.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            self.executor = self._start_executor()
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def search_root(self, board, depth, slot, deadline, first_move=None, stop=None, counter=None, token=None):
+        """Return (best score, best cell index) for O, like search.search_root.
+
+        counter, if given, is a SearchContext that collects the workers'
+        search counters. token is the search's token in self.tokens[slot].
+
+        Workers cannot see stop; a stopped search is seen here within
+        STOP_POLL seconds, its pending tasks are cancelled, and
+        make_timed_move withdraws its token to stop the running ones.
+        """
+        executor = self.executor
+        empty_cells = order_moves(board, O, None, depth + 1)
+        if first_move is not None:
+            empty_cells.remove(first_move)
+            empty_cells.insert(0, first_move)
+
+        # Root moves that are symmetric to one already listed are skipped
+        root_moves = []
+        seen = set()
+        for index in empty_cells:
+            board.play(index, O)
+            child_key = board.canonical()[0]
+            board.undo()
+            if child_key not in seen:
+                seen.add(child_key)
+                root_moves.append(index)
+
+        self.alphas[slot] = float('-inf')
+        history = list(board.history)
+
+        def check_time():
+            if time.perf_counter() > deadline or (stop is not None and stop.is_set()):
+                raise SearchTimeout()
+
+        def submit(index, alpha):
+            check_time()
+            return executor.submit(_search_root_move, history, index, depth, alpha, slot, token, deadline)
+
+        def collect(future):
+            # Wait in short steps so a stop is seen while a worker is busy
+            while True:
+                check_time()
+                try:
+                    score, counters = future.result(STOP_POLL)
+                    break
+                except TimeoutError:
+                    pass
+            if counter is not None:
+                counter.add_counters(counters)
+            return score
+
+        # The eldest brother is searched alone to give the others an alpha
+        best_move = root_moves[0]
+        best_score = collect(submit(best_move, float('-inf')))
+
+        futures = []
+        try:
+            for index in root_moves[1:]:
+                futures.append((index, submit(index, best_score)))
+            # Collect in order so ties go to the better-ordered move
+            for index, future in futures:
+                score = collect(future)
+                if score > best_score:
+                    best_score = score
+                    best_move = index
+        except BrokenProcessPool:
+            # A broken pool fails its pending futures itself, and cancelling
+            # them first breaks its cleanup
+            futures = []
+            raise
+        finally:
+            for _, future in futures:
+                future.cancel()
+
+        return best_score, best_move
+
+    def make_timed_move(self, board, time_ms, max_depth, root_cache=None, stop=None, stats=None):
+        """Iterative deepening like search.make_timed_move, with each depth's
+        root moves searched in parallel"""
+        board = board.copy()
+        key, symmetry = board.canonical()
+        if root_cache is not None:
+            entry = root_cache.get((key, max_depth))
+            if entry is not None:
+                if stats is not None:
+                    stats.update(SearchContext().report(max_depth))
+                return cell_coords(INVERSE_SYMMETRIES[symmetry][entry[3]])
+
+        # Depth 0 is cheaper to search here than to send to the pool
+        counter = SearchContext()
+        best_score, best_move = search_root(board, 0, counter)
+        deadline = time.perf_counter() + time_ms / 1000
+        timed_out = False
+        completed = 0
+        executor = self.executor
+        slot = self.slots.get()
+        token = next(self.next_token)
+        self.tokens[slot] = token
+        try:
+            for depth in range(1, max_depth + 1):
+                if abs(best_score) > WIN_THRESHOLD:
+                    break
+                try:
+                    best_score, best_move = self.search_root(
+                        board, depth, slot, deadline, best_move, stop, counter, token
+                    )
+                except SearchTimeout:
+                    timed_out = True
+                    break
+                completed = depth
+        except BrokenProcessPool:
+            # Play this move with a serial search in the time that is left,
+            # then replace the pool for the moves after it
+            time_left = max(0, deadline - time.perf_counter()) * 1000
+            try:
+                return search.make_timed_move(board, time_left, max_depth, root_cache=root_cache, stop=stop, stats=stats)
+            finally:
+                self._restart(executor)
+        finally:
+            # Withdraw the token so tasks still running for this search stop
+            self.tokens[slot] = 0
+            self.slots.put(slot)
+
+        if stats is not None:
+            stats.update(counter.report(completed))
+
+        if root_cache is not None and not timed_out:
+            root_cache.store((key, max_depth), max_depth, best_score, EXACT, SYMMETRIES[symmetry][best_move])
+        return cell_coords(best_move)
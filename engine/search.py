@@ -0,0 +1,337 @@
+"""Minimax search for the bot, played as O against X"""
+
+import time
+
+from engine.bitboard import X, O, CELLS, CELL_LINES, ZOBRIST_SIDE, SYMMETRIES, INVERSE_SYMMETRIES, cell_coords
+from engine.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Larger than any heuristic score (76 lines * 100), plus up to 64 for speed
+WIN_SCORE = 10000
+WIN_THRESHOLD = WIN_SCORE - 100
+
+# Per-move caps for each bot difficulty. smart_rate is the chance the bot
+# searches at all instead of playing a random cell, threat_depth caps the
+# attacker moves in a forced-win sequence (see engine.threats), and parallel
+# spreads the root moves over a process pool (see engine.parallel). Levels
+# with engine 'mcts' use Monte Carlo tree search (see engine.mcts) with a
+# simulation budget instead of minimax; their max_depth of 0 keeps them off
+# the opening book, which holds minimax moves.
+DIFFICULTY_LEVELS = {
+    'easy': {'engine': 'minimax', 'smart_rate': 0.2, 'time_ms': 250, 'max_depth': 1, 'threat_depth': 1,
+             'parallel': False},
+    'medium': {'engine': 'minimax', 'smart_rate': 0.7, 'time_ms': 1000, 'max_depth': 2, 'threat_depth': 4,
+               'parallel': False},
+    'hard': {'engine': 'minimax', 'smart_rate': 1.0, 'time_ms': 3000, 'max_depth': 8, 'threat_depth': 16,
+             'parallel': True},
+    'mcts': {'engine': 'mcts', 'smart_rate': 1.0, 'time_ms': 3000, 'max_depth': 0, 'threat_depth': 16,
+             'parallel': False, 'simulations': 100_000, 'heavy_playouts': True},
+}
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget for a move runs out,
+    or the search is cancelled"""
+
+
+def _to_table(score, depth):
+    # Store win scores relative to this node so they stay valid at other depths
+    if score > WIN_THRESHOLD:
+        return score - depth
+    if score < -WIN_THRESHOLD:
+        return score + depth
+    return score
+
+
+def _from_table(score, depth):
+    if score > WIN_THRESHOLD:
+        return score + depth
+    if score < -WIN_THRESHOLD:
+        return score - depth
+    return score
+
+
+# ORDER_WEIGHTS[own][opp]: how promising a line is for the player to move.
+# Completing a line beats everything, then blocking the opponent's three,
+# then lines that are still open for either side.
+ORDER_WEIGHTS = [[0] * 5 for _ in range(5)]
+ORDER_WEIGHTS[3][0] = 1_000_000
+ORDER_WEIGHTS[0][3] = 100_000
+ORDER_WEIGHTS[2][0] = 100
+ORDER_WEIGHTS[0][2] = 50
+ORDER_WEIGHTS[1][0] = 10
+ORDER_WEIGHTS[0][1] = 5
+ORDER_WEIGHTS[0][0] = 1
+
+# History scores are capped so they only break ties between line scores
+HISTORY_LIMIT = 1 << 16
+
+
+class SearchContext:
+    """State shared by every node searched for one bot move"""
+
+    # Counters kept while searching, see report()
+    COUNTERS = ('nodes', 'cutoffs', 'tt_hits', 'expanded')
+
+    def __init__(self, table=None, deadline=None, stop=None):
+        self.table = table
+        self.deadline = deadline
+        # A threading.Event that cancels the search when set
+        self.stop = stop
+        # Up to two moves per remaining depth that caused a cutoff
+        self.killers = {}
+        # Per side and cell, how often a move caused a cutoff, weighted by depth
+        self.history = [[0] * CELLS, [0] * CELLS]
+        # Positions visited, alpha-beta cutoffs, table entries found, and
+        # positions whose moves were searched (the root included)
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.expanded = 0
+
+    def record_cutoff(self, depth, side, index):
+        self.cutoffs += 1
+        killers = self.killers.setdefault(depth, [])
+        if index not in killers:
+            killers.insert(0, index)
+            del killers[2:]
+        history = self.history[side]
+        history[index] = min(history[index] + depth * depth, HISTORY_LIMIT - 1)
+
+    def counters(self):
+        return {name: getattr(self, name) for name in self.COUNTERS}
+
+    def add_counters(self, counters):
+        """Add counters from a search done elsewhere, e.g. in another process"""
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def report(self, depth):
+        """Counters plus the depth completed and the mean moves searched per
+        expanded position (the effective branching factor)"""
+        report = self.counters()
+        report['depth'] = depth
+        report['branching'] = round(self.nodes / self.expanded, 2) if self.expanded else 0.0
+        return report
+
+
+def order_moves(board, side, context=None, depth=0):
+    """Return the empty cells, most promising first for side.
+
+    Cells are ranked by the lines through them (wins, then blocks, then the
+    most open lines), with killer moves and the history heuristic breaking ties.
+    """
+    own_counts = board.counts[side]
+    opp_counts = board.counts[1 - side]
+    killers = context.killers.get(depth, ()) if context is not None else ()
+    history = context.history[side] if context is not None else None
+    keyed = []
+    for index in board.empty_indices():
+        score = 0
+        for line_id in CELL_LINES[index]:
+            score += ORDER_WEIGHTS[own_counts[line_id]][opp_counts[line_id]]
+        key = score * 2 * HISTORY_LIMIT
+        if index in killers:
+            key += HISTORY_LIMIT
+        if history is not None:
+            key += history[index]
+        keyed.append((key, index))
+    keyed.sort(reverse=True)
+    return [index for _, index in keyed]
+
+
+def minimax(board, depth, is_maximizing, alpha, beta, context=None):
+    """Minimax algorithm with alpha-beta pruning.
+
+    context carries the optional transposition table, deadline and move
+    ordering heuristics shared across the search.
+    """
+    if context is None:
+        context = SearchContext()
+    context.nodes += 1
+    if board.last_move_wins() is not None:
+        if board.history[-1][1] == O:
+            return WIN_SCORE + depth
+        return -WIN_SCORE - depth
+    if depth == 0 or board.is_full():
+        return board.score
+    if context.deadline is not None and time.perf_counter() > context.deadline:
+        raise SearchTimeout()
+    if context.stop is not None and context.stop.is_set():
+        raise SearchTimeout()
+
+    table = context.table
+    best_move = None
+    if table is not None:
+        # Look positions up in canonical orientation, so all 48 symmetric
+        # copies share one entry; moves are stored in that orientation too
+        key, symmetry = board.canonical()
+        if not is_maximizing:
+            key ^= ZOBRIST_SIDE
+        entry = table.get(key)
+        if entry is not None:
+            context.tt_hits += 1
+            entry_depth, entry_score, bound, best_move = entry
+            best_move = INVERSE_SYMMETRIES[symmetry][best_move]
+            if entry_depth >= depth:
+                entry_score = _from_table(entry_score, depth)
+                if bound == EXACT:
+                    return entry_score
+                if bound == LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if beta <= alpha:
+                    return entry_score
+    alpha_orig, beta_orig = alpha, beta
+    context.expanded += 1
+
+    side = O if is_maximizing else X
+    empty_cells = order_moves(board, side, context, depth)
+    # Try the best move from an earlier search of this position first
+    if best_move is not None:
+        empty_cells.remove(best_move)
+        empty_cells.insert(0, best_move)
+
+    if is_maximizing:
+        best_eval = float('-inf')
+        for index in empty_cells:
+            board.play(index, O)
+            eval = minimax(board, depth - 1, False, alpha, beta, context)
+            board.undo()
+            if eval > best_eval:
+                best_eval = eval
+                best_move = index
+            alpha = max(alpha, eval)
+            if beta <= alpha:
+                context.record_cutoff(depth, side, index)
+                break
+    else:
+        best_eval = float('inf')
+        for index in empty_cells:
+            board.play(index, X)
+            eval = minimax(board, depth - 1, True, alpha, beta, context)
+            board.undo()
+            if eval < best_eval:
+                best_eval = eval
+                best_move = index
+            beta = min(beta, eval)
+            if beta <= alpha:
+                context.record_cutoff(depth, side, index)
+                break
+
+    if table is not None:
+        if best_eval <= alpha_orig:
+            bound = UPPER
+        elif best_eval >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        table.store(key, depth, _to_table(best_eval, depth), bound, SYMMETRIES[symmetry][best_move])
+    return best_eval
+
+
+def search_root(board, depth, context, first_move=None):
+    """Return (best score, best cell index) for O to move on board.
+
+    Each root move is searched with the best score so far as its alpha
+    bound, so moves that cannot beat it are cut off early.
+    """
+    empty_cells = order_moves(board, O, context, depth + 1)
+    if first_move is not None:
+        empty_cells.remove(first_move)
+        empty_cells.insert(0, first_move)
+    best_score = float('-inf')
+    best_move = empty_cells[0]
+    context.expanded += 1
+
+    # The table is shared by every root move, so transpositions between
+    # their subtrees are only searched once. Root moves that are symmetric
+    # to one already tried lead to the same position and are skipped.
+    seen = set()
+    for index in empty_cells:
+        board.play(index, O)
+        child_key = board.canonical()[0]
+        if child_key not in seen:
+            seen.add(child_key)
+            score = minimax(board, depth, False, best_score, float('inf'), context)
+            if score > best_score:
+                best_score = score
+                best_move = index
+        board.undo()
+
+    return best_score, best_move
+
+
+def make_smart_move(board, depth, table=None, root_cache=None, stats=None):
+    """Return the (z, y, x) cell minimax rates best for O.
+
+    root_cache, if given, keeps the chosen move per canonical position and
+    depth across games, so a position seen before in any orientation is
+    answered without searching. stats, if given, is a dict that receives
+    SearchContext.report() for the search.
+    """
+    if table is None:
+        table = TranspositionTable()
+    board = board.copy()
+    key, symmetry = board.canonical()
+    if root_cache is not None:
+        entry = root_cache.get((key, depth))
+        if entry is not None:
+            if stats is not None:
+                stats.update(SearchContext().report(depth))
+            return cell_coords(INVERSE_SYMMETRIES[symmetry][entry[3]])
+
+    context = SearchContext(table)
+    best_score, best_move = search_root(board, depth, context)
+    if stats is not None:
+        stats.update(context.report(depth))
+
+    if root_cache is not None:
+        root_cache.store((key, depth), depth, best_score, EXACT, SYMMETRIES[symmetry][best_move])
+    return cell_coords(best_move)
+
+
+def make_timed_move(board, time_ms, max_depth, table=None, root_cache=None, stop=None, stats=None):
+    """Iterative deepening: search depth 0, 1, 2, ... up to max_depth until
+    time_ms runs out or stop is set, and return the best move of the last
+    completed depth.
+
+    Depth 0 always completes so there is a move to play. Each depth searches
+    the previous best move first, and entries stored by shallower iterations
+    order the moves of deeper ones through the table. stats, if given, is a
+    dict that receives SearchContext.report() for the search.
+    """
+    if table is None:
+        table = TranspositionTable()
+    board = board.copy()
+    key, symmetry = board.canonical()
+    if root_cache is not None:
+        entry = root_cache.get((key, max_depth))
+        if entry is not None:
+            if stats is not None:
+                stats.update(SearchContext().report(max_depth))
+            return cell_coords(INVERSE_SYMMETRIES[symmetry][entry[3]])
+
+    context = SearchContext(table, stop=stop)
+    best_score, best_move = search_root(board, 0, context)
+    context.deadline = time.perf_counter() + time_ms / 1000
+    timed_out = False
+    completed = 0
+    for depth in range(1, max_depth + 1):
+        # A found win or loss will not change with more depth
+        if abs(best_score) > WIN_THRESHOLD:
+            break
+        try:
+            best_score, best_move = search_root(board, depth, context, best_move)
+        except SearchTimeout:
+            timed_out = True
+            break
+        completed = depth
+
+    if stats is not None:
+        stats.update(context.report(completed))
+
+    # Only a result that did not depend on the clock is worth reusing
+    if root_cache is not None and not timed_out:
+        root_cache.store((key, max_depth), max_depth, best_score, EXACT, SYMMETRIES[symmetry][best_move])
+    return cell_coords(best_move)
@@ -0,0 +1,222 @@
+"""Server-wide bot service: one bounded worker pool for every game.
+
+Move requests from all sessions go through one priority queue served by a
+fixed number of worker threads, so the number of concurrent searches stays
+bounded however many games are running. Requests for the same canonical
+position at the same level share one search: its move is kept in the
+canonical orientation and mapped back into each requester's own.
+
+Every move comes back with its search stats (see bot.choose_smart_move),
+which are also logged and aggregated per difficulty.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from engine import bot, search
+from engine.bitboard import SYMMETRIES, INVERSE_SYMMETRIES, cell_coords, cell_index
+from engine.transposition import TranspositionTable
+
+logger = logging.getLogger(__name__)
+
+
+class BotServiceBusy(Exception):
+    """Raised by BotService.submit when the request queue is full"""
+
+
+class _Job:
+    def __init__(self, key, board, difficulty):
+        self.key = key
+        self.board = board
+        self.difficulty = difficulty
+        self.level = search.DIFFICULTY_LEVELS[difficulty]
+        self.stop = threading.Event()
+        # (future, symmetry) for every request waiting on this search
+        self.waiters = []
+        self.queued_at = time.perf_counter()
+
+
+class BotService:
+    """Priority queue of bot move requests served by a fixed pool of threads"""
+
+    def __init__(self, opening_book=None, root_cache=None, pool=None, trees=None, workers=4, max_queue=256,
+                 history=1000):
+        self.opening_book = opening_book
+        self.root_cache = root_cache
+        self.pool = pool
+        self.trees = trees
+        self.max_queue = max_queue
+        self.queue = queue.PriorityQueue()
+        self.lock = threading.Lock()
+        # Queued or running jobs by (canonical key, level), for deduplication
+        self.jobs = {}
+        self.sequence = itertools.count()
+        self.running = 0
+        self.counters = {'requests': 0, 'deduplicated': 0, 'completed': 0, 'cancelled': 0, 'failed': 0, 'rejected': 0}
+        self.wait_times = deque(maxlen=history)
+        self.search_times = deque(maxlen=history)
+        # Search stats totals by difficulty, see search_summary()
+        self.search_totals = {}
+        self.local = threading.local()
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"bot-service-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, board, difficulty, priority=None):
+        """Queue a move request for O on board at a difficulty of
+        search.DIFFICULTY_LEVELS, and return a Future of ((z, y, x), stats).
+
+        Lower priority values are served first; by default that is the
+        level's time budget, so quick moves do not wait behind deep searches.
+        Cancelling the future withdraws the request, and a search nobody
+        waits for any more is stopped.
+        """
+        key, symmetry = board.canonical()
+        job_key = (key, difficulty)
+        future = Future()
+        with self.lock:
+            self.counters['requests'] += 1
+            job = self.jobs.get(job_key)
+            if job is not None:
+                self.counters['deduplicated'] += 1
+            else:
+                if len(self.jobs) - self.running >= self.max_queue:
+                    self.counters['rejected'] += 1
+                    raise BotServiceBusy(f"{self.max_queue} bot moves already queued")
+                job = _Job(job_key, board.copy(), difficulty)
+                self.jobs[job_key] = job
+                if priority is None:
+                    priority = job.level['time_ms']
+                self.queue.put((priority, next(self.sequence), job))
+            job.waiters.append((future, symmetry))
+        future.add_done_callback(lambda f: f.cancelled() and self._withdraw(job))
+        return future
+
+    def _withdraw(self, job):
+        with self.lock:
+            if all(future.cancelled() for future, _ in job.waiters):
+                job.stop.set()
+                # A later request for the same position must start a new search,
+                # not wait on this stopped one
+                if self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+
+    def _worker(self):
+        # Each worker keeps its own transposition table warm between jobs
+        self.local.table = TranspositionTable()
+        while True:
+            _, _, job = self.queue.get()
+            with self.lock:
+                if job.stop.is_set():
+                    if self.jobs.get(job.key) is job:
+                        del self.jobs[job.key]
+                    self.counters['cancelled'] += 1
+                    waiters = job.waiters[:]
+                else:
+                    waiters = None
+                    self.running += 1
+            if waiters is not None:
+                # Nobody should still be waiting, but never leave a future unresolved
+                for future, _ in waiters:
+                    future.cancel()
+                continue
+            started = time.perf_counter()
+            self.wait_times.append(started - job.queued_at)
+            stats = {}
+            try:
+                move = bot.choose_smart_move(
+                    job.board, job.level, self.opening_book, self.local.table, self.root_cache, self.pool, job.stop,
+                    stats, self.trees
+                )
+                error = None
+            except Exception as e:
+                move, error = None, e
+            self.search_times.append(time.perf_counter() - started)
+
+            with self.lock:
+                self.running -= 1
+                if self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+                waiters = job.waiters[:]
+                if job.stop.is_set():
+                    self.counters['cancelled'] += 1
+                else:
+                    self.counters['failed' if error else 'completed'] += 1
+                    if error is None:
+                        self._record(job, stats)
+            if error is None:
+                # Express the move in the canonical orientation, then in each waiter's
+                _, symmetry = job.board.canonical()
+                canonical_move = SYMMETRIES[symmetry][cell_index(*move)]
+            for future, waiter_symmetry in waiters:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if error is None:
+                    waiter_move = cell_coords(INVERSE_SYMMETRIES[waiter_symmetry][canonical_move])
+                    future.set_result((waiter_move, dict(stats)))
+                else:
+                    future.set_exception(error)
+
+    def _record(self, job, stats):
+        """Add a finished search to the totals and log it; call with the lock held"""
+        totals = self.search_totals.setdefault(job.difficulty, {
+            'moves': 0, 'ms': 0.0, 'max_ms': 0.0, 'max_depth': 0,
+            'sources': {'book': 0, 'threats': 0, 'search': 0},
+            **dict.fromkeys(search.SearchContext.COUNTERS, 0)
+        })
+        totals['moves'] += 1
+        totals['ms'] += stats['ms']
+        totals['max_ms'] = max(totals['max_ms'], stats['ms'])
+        totals['max_depth'] = max(totals['max_depth'], stats['depth'])
+        totals['sources'][stats['source']] += 1
+        for name in search.SearchContext.COUNTERS:
+            totals[name] += stats[name]
+
+        logger.info("%s move from %s: %s", job.difficulty, stats['source'], stats)
+        # Flag searches that ran well past their budget, with the position to replay
+        if stats['ms'] > 2 * job.level['time_ms']:
+            logger.warning(
+                "slow %s move: %.0f ms, moves %s", job.difficulty, stats['ms'], job.board.history
+            )
+
+    def search_summary(self):
+        """Per difficulty: moves answered, their sources, mean and max wall
+        time, deepest search, and mean nodes, cutoffs and table hits per move"""
+        summary = {}
+        with self.lock:
+            for difficulty, totals in self.search_totals.items():
+                moves = totals['moves']
+                summary[difficulty] = {
+                    'moves': moves,
+                    'sources': dict(totals['sources']),
+                    'mean_ms': round(totals['ms'] / moves, 1),
+                    'max_ms': totals['max_ms'],
+                    'max_depth': totals['max_depth'],
+                    'mean_nodes': round(totals['nodes'] / moves),
+                    'mean_cutoffs': round(totals['cutoffs'] / moves),
+                    'mean_tt_hits': round(totals['tt_hits'] / moves),
+                    'branching': round(totals['nodes'] / totals['expanded'], 2) if totals['expanded'] else 0.0,
+                }
+        return summary
+
+    def stats(self):
+        """Queue depth, counters and latency percentiles in milliseconds"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['queued'] = len(self.jobs) - self.running
+            stats['running'] = self.running
+        stats['workers'] = len(self.threads)
+        for name, samples in (('wait', self.wait_times), ('search', self.search_times)):
+            ordered = sorted(samples)
+            for pct in (50, 95, 99):
+                value = ordered[min(len(ordered) - 1, len(ordered) * pct // 100)] * 1000 if ordered else 0.0
+                stats[f'{name}_p{pct}_ms'] = round(value, 1)
+        return stats
@@ -0,0 +1,43 @@
+"""Bounded transposition table keyed by Zobrist hash"""
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """Maps position hashes to (depth, score, bound, best move).
+
+    A position that is already stored is only overwritten by a search at least
+    as deep. When the table is full the oldest entry is evicted, which keeps
+    entries from the current move and drops those from earlier in the game.
+    A table may be shared between threads; concurrent stores can at worst
+    lose an entry.
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def store(self, key, depth, score, bound, best_move):
+        entries = self.entries
+        existing = entries.get(key)
+        if existing is not None:
+            if existing[0] > depth:
+                return
+            # Re-insert so the entry counts as recent for eviction
+            entries.pop(key, None)
+        elif len(entries) >= self.max_entries:
+            try:
+                del entries[next(iter(entries))]
+            except (KeyError, RuntimeError):
+                # Another thread sharing the table evicted at the same time
+                pass
+        entries[key] = (depth, score, bound, best_move)
+
+    def clear(self):
+        self.entries.clear()
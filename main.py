@@ -1,18 +1,21 @@
 import streamlit as st
-import numpy as np
-import plotly.graph_objects as go
 import random
 from datetime import datetime
 from components.achievements import init_achievements, check_achievement, display_achievements
 from components.stats import init_stats, update_stats, display_stats
-from components.themes import init_theme, get_current_theme, apply_theme, display_theme_selector
+from components.themes import init_theme, get_current_theme, apply_theme, apply_styles, display_theme_selector
 from components.user_system import init_user_system, render_auth_ui, display_user_stats
 from components.stats_dashboard import display_leaderboard, display_global_stats
 from components.tutorial import run_tutorial
 from components.tournament import init_tournament_system, handle_tournament_ui
 from components.power_ups import init_power_ups, award_power_up, display_power_ups, handle_power_up_effects
 from components.chat import init_chat, display_chat, send_game_event
+from components.board_3d import board_3d
+from components.board_input import board_input
+from components.bot_worker import init_bot_worker, start_bot_job, cancel_bot_job, bot_is_thinking, poll_bot_job, bot_service_stats
 from database.manager import DatabaseManager
+from engine.bitboard import Board, LINE_KINDS, PLAYERS
+from engine import search
 
 # Page config
 st.set_page_config(page_title="3D Tic Tac Toe", page_icon="🎮", layout="wide")
@@ -24,13 +27,13 @@ if 'power_ups' not in st.session_state or not isinstance(st.session_state.power_
     st.session_state.power_ups = {'X': [], 'O': []}
 
 if 'board' not in st.session_state:
-    st.session_state.board = np.full((4, 4, 4), '', dtype=object)
+    st.session_state.board = Board()
     st.session_state.current_player = 'X'
     st.session_state.winner = None
+    st.session_state.winning_line = None
     st.session_state.game_over = False
     st.session_state.game_mode = 'human'
     st.session_state.difficulty = 'medium'
-    st.session_state.last_camera = None
     st.session_state.move_count = 0
     st.session_state.game_start_time = datetime.now()
     st.session_state.current_time = datetime.now()
@@ -47,227 +50,25 @@ init_tournament_system()
 init_power_ups()
 init_chat()
 init_user_system()
+init_bot_worker()
 
-def create_3d_board():
-    """Create a 3D visualization of the game board using Plotly"""
-    x, y, z, text = [], [], [], []
-    marker_colors = []
-    marker_sizes = []
-    
-    for i in range(4):
-        for j in range(4):
-            for k in range(4):
-                x.append(i)
-                y.append(j)
-                z.append(k)
-                cell_value = st.session_state.board[i, j, k]
-                text.append(cell_value if cell_value != '' else '')
-                
-                if cell_value == 'X':
-                    marker_colors.append('rgba(0, 0, 0, 1.0)')
-                    marker_sizes.append(45)
-                elif cell_value == 'O':
-                    marker_colors.append('rgba(255, 255, 255, 1.0)')
-                    marker_sizes.append(45)
-                else:
-                    marker_colors.append('rgba(220, 220, 220, 0.25)')
-                    marker_sizes.append(35)
-
-    fig = go.Figure(data=[
-        go.Scatter3d(
-            x=x, y=y, z=z, 
-            mode='markers+text',
-            marker=dict(
-                size=marker_sizes,
-                color=marker_colors,
-                line=dict(width=2, color='#666666')
-            ),
-            text=text,
-            textfont=dict(size=22, color='#333333', family='Arial Black'),
-            textposition="middle center",
-            hoverinfo='skip'
-        )
-    ])
-
-    # Add enhanced grid lines
-    for i in range(5):
-        for j in range(5):
-            for lines in [
-                ([i-0.5, i-0.5], [j-0.5, j-0.5], [-0.5, 3.5]),
-                ([i-0.5, i-0.5], [-0.5, 3.5], [j-0.5, j-0.5]),
-                ([-0.5, 3.5], [i-0.5, i-0.5], [j-0.5, j-0.5])
-            ]:
-                fig.add_trace(go.Scatter3d(
-                    x=lines[0], y=lines[1], z=lines[2],
-                    mode='lines', 
-                    line=dict(color='#BBBBBB', width=1.5), 
-                    showlegend=False,
-                    hoverinfo='skip'
-                ))
-
-    # Save the last camera state if available
-    if 'relayoutData' in st._config._config_options['plotly_config']:
-        camera_data = st._config._config_options['plotly_config']['relayoutData']
-        if 'scene.camera' in camera_data:
-            st.session_state.last_camera = camera_data['scene.camera']
-    
-    # Use the saved camera or default
-    camera = st.session_state.last_camera or dict(
-        up=dict(x=0, y=0, z=1),
-        center=dict(x=1.5, y=1.5, z=1.5),
-        eye=dict(x=3.5, y=3.5, z=3.5)  # Moved camera further back for better view
-    )
-
-    fig.update_layout(
-        scene=dict(
-            xaxis=dict(range=[-1, 4], showgrid=False, zeroline=False, showticklabels=False, showbackground=False),
-            yaxis=dict(range=[-1, 4], showgrid=False, zeroline=False, showticklabels=False, showbackground=False),
-            zaxis=dict(range=[-1, 4], showgrid=False, zeroline=False, showticklabels=False, showbackground=False),
-            bgcolor='rgba(245, 245, 245, 0.3)'
-        ),
-        margin=dict(l=0, r=0, t=0, b=0),
-        showlegend=False,
-        scene_camera=camera,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        uirevision='constant',
-        height=500
-    )
-    return fig
+# Compiled stylesheet and theme class; the CSS itself lives in static/css
+apply_styles()
 
 def is_diagonal_win():
     """Check if the last win was achieved through a diagonal"""
-    diagonals = [
-        [(i, i, i) for i in range(4)],
-        [(i, i, 3-i) for i in range(4)],
-        [(i, 3-i, i) for i in range(4)],
-        [(i, 3-i, 3-i) for i in range(4)]
-    ]
-    board = st.session_state.board
-    winner = st.session_state.winner
-    for diagonal in diagonals:
-        if all(board[z, y, x] == winner for z, y, x in diagonal):
-            return True
-    return False
-
-def check_winner(board):
-    """Check all possible winning combinations in 3D tic-tac-toe"""
-    # Straight lines
-    for i in range(4):
-        for j in range(4):
-            if all(board[i, j, k] == board[i, j, 0] != '' for k in range(4)):
-                return board[i, j, 0]
-            if all(board[i, k, j] == board[i, 0, j] != '' for k in range(4)):
-                return board[i, 0, j]
-            if all(board[k, i, j] == board[0, i, j] != '' for k in range(4)):
-                return board[0, i, j]
-    
-    # Face diagonals
-    for i in range(4):
-        if all(board[i, k, k] == board[i, 0, 0] != '' for k in range(4)):
-            return board[i, 0, 0]
-        if all(board[i, k, 3-k] == board[i, 0, 3] != '' for k in range(4)):
-            return board[i, 0, 3]
-        if all(board[k, i, k] == board[0, i, 0] != '' for k in range(4)):
-            return board[0, i, 0]
-        if all(board[k, i, 3-k] == board[0, i, 3] != '' for k in range(4)):
-            return board[0, i, 3]
-        if all(board[k, k, i] == board[0, 0, i] != '' for k in range(4)):
-            return board[0, 0, i]
-        if all(board[k, 3-k, i] == board[0, 3, i] != '' for k in range(4)):
-            return board[0, 3, i]
-    
-    # Space diagonals
-    if all(board[k, k, k] == board[0, 0, 0] != '' for k in range(4)):
-        return board[0, 0, 0]
-    if all(board[k, k, 3-k] == board[0, 0, 3] != '' for k in range(4)):
-        return board[0, 0, 3]
-    if all(board[k, 3-k, k] == board[0, 3, 0] != '' for k in range(4)):
-        return board[0, 3, 0]
-    if all(board[k, 3-k, 3-k] == board[0, 3, 3] != '' for k in range(4)):
-        return board[0, 3, 3]
-    
-    return None
-
-def evaluate_board(board):
-    """Evaluate the board state"""
-    winner = check_winner(board)
-    if winner == 'O':
-        return 1000
-    elif winner == 'X':
-        return -1000
-    
-    score = 0
-    for i in range(4):
-        for j in range(4):
-            row = board[i, j, :]
-            score += evaluate_line(row)
-            col = board[i, :, j]
-            score += evaluate_line(col)
-            depth = board[:, i, j]
-            score += evaluate_line(depth)
-    
-    return score
+    line_id = st.session_state.get('winning_line')
+    return line_id is not None and LINE_KINDS[line_id] == 'space'
 
-def evaluate_line(line):
-    """Evaluate a line of 4 cells"""
-    if '' not in line:
-        return 0
-    
-    x_count = np.count_nonzero(line == 'X')
-    o_count = np.count_nonzero(line == 'O')
-    
-    if o_count == 3 and x_count == 0:
-        return 100
-    elif x_count == 3 and o_count == 0:
-        return -100
-    elif o_count == 2 and x_count == 0:
-        return 10
-    elif x_count == 2 and o_count == 0:
-        return -10
-    elif o_count == 1 and x_count == 0:
-        return 1
-    elif x_count == 1 and o_count == 0:
-        return -1
-    
-    return 0
+def check_last_move(board):
+    """Return (winner, line id) for the line completed by the last move, or (None, None)"""
+    line_id = board.last_move_wins()
+    if line_id is None:
+        return None, None
+    return PLAYERS[board.history[-1][1]], line_id
 
 def get_empty_cells(board):
-    return [(z, y, x) for z in range(4) for y in range(4) for x in range(4) if board[z, y, x] == '']
-
-def minimax(board, depth, is_maximizing, alpha, beta):
-    """Minimax algorithm with alpha-beta pruning"""
-    winner = check_winner(board)
-    if winner == 'O':
-        return 1000 + depth
-    if winner == 'X':
-        return -1000 - depth
-    if depth == 0 or not np.any(board == ''):
-        return evaluate_board(board)
-    
-    empty_cells = get_empty_cells(board)
-    if is_maximizing:
-        max_eval = float('-inf')
-        for z, y, x in empty_cells:
-            board[z, y, x] = 'O'
-            eval = minimax(board, depth - 1, False, alpha, beta)
-            board[z, y, x] = ''
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval
-    else:
-        min_eval = float('inf')
-        for z, y, x in empty_cells:
-            board[z, y, x] = 'X'
-            eval = minimax(board, depth - 1, True, alpha, beta)
-            board[z, y, x] = ''
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval
+    return board.empty_cells()
 
 def make_bot_move():
     """Make a move for the bot based on difficulty level"""
@@ -275,41 +76,21 @@ def make_bot_move():
     if not empty_cells:
         return
     
-    difficulty = st.session_state.difficulty
-    if difficulty == 'easy':
-        if random.random() < 0.2:
-            z, y, x = make_smart_move(empty_cells, depth=1)
-        else:
-            z, y, x = random.choice(empty_cells)
-    elif difficulty == 'medium':
-        if random.random() < 0.7:
-            z, y, x = make_smart_move(empty_cells, depth=2)
-        else:
-            z, y, x = random.choice(empty_cells)
-    else:  # hard
-        z, y, x = make_smart_move(empty_cells, depth=3)
-    
-    make_move(z, y, x)
-
-def make_smart_move(empty_cells, depth):
-    """Make a move using minimax algorithm"""
-    best_score = float('-inf')
-    best_move = empty_cells[0]
+    level = search.DIFFICULTY_LEVELS[st.session_state.difficulty]
+    if random.random() >= level['smart_rate']:
+        make_move(*random.choice(empty_cells))
+        return
     
-    for z, y, x in empty_cells:
-        board_copy = st.session_state.board.copy()
-        board_copy[z, y, x] = 'O'
-        score = minimax(board_copy, depth, False, float('-inf'), float('inf'))
-        if score > best_score:
-            best_score = score
-            best_move = (z, y, x)
-            
-    return best_move
+    # Search in the background so the player's move renders right away;
+    # poll_bot_job plays the result when it is ready. If the shared bot
+    # service is saturated, answer with a shallow search instead of waiting.
+    if not start_bot_job(st.session_state.board.copy(), st.session_state.difficulty):
+        make_move(*search.make_smart_move(st.session_state.board, 1))
 
 def make_move(z, y, x):
     if st.session_state.game_over:
         return
-    if st.session_state.board[z, y, x] != '':
+    if not st.session_state.board.is_empty(z, y, x):
         return
     
     st.session_state.moves_history.append((z, y, x, st.session_state.current_player))
@@ -320,14 +101,15 @@ def make_move(z, y, x):
     if st.session_state.power_ups.get(current_player, []):
         handle_power_up_effects()
     
-    st.session_state.board[z, y, x] = st.session_state.current_player
+    st.session_state.board.make_move(z, y, x, st.session_state.current_player)
     send_game_event(f"Player {st.session_state.current_player} → L{z+1}R{y+1}C{x+1}")
     
-    winner = check_winner(st.session_state.board)
+    winner, line_id = check_last_move(st.session_state.board)
     game_end = False
     
     if winner:
         st.session_state.winner = winner
+        st.session_state.winning_line = line_id
         st.session_state.game_over = True
         game_end = True
         duration = (datetime.now() - st.session_state.game_start_time).total_seconds()
@@ -337,13 +119,13 @@ def make_move(z, y, x):
                 st.balloons()
             if duration < 30:
                 check_achievement('speed_demon')
-            if st.session_state.game_mode == 'bot' and st.session_state.difficulty == 'hard':
+            if st.session_state.game_mode == 'bot' and st.session_state.difficulty in ('hard', 'mcts'):
                 check_achievement('bot_master')
             if is_diagonal_win():
                 check_achievement('diagonal_win')
             if st.session_state.stats.get('current_streak', 0) == 4:
                 check_achievement('undefeated')
-    elif not np.any(st.session_state.board == ''):
+    elif st.session_state.board.is_full():
         st.session_state.game_over = True
         game_end = True
     else:
@@ -362,9 +144,11 @@ def make_move(z, y, x):
     st.rerun()
 
 def reset_game():
-    st.session_state.board = np.full((4, 4, 4), '', dtype=object)
+    cancel_bot_job()
+    st.session_state.board = Board()
     st.session_state.current_player = 'X'
     st.session_state.winner = None
+    st.session_state.winning_line = None
     st.session_state.game_over = False
     st.session_state.move_count = 0
     st.session_state.game_start_time = datetime.now()
@@ -377,9 +161,9 @@ def reset_game():
 
 # Header
 st.markdown("""
-    <div style='text-align: center; padding: 1rem 0;'>
-        <h1 style='margin: 0; font-size: 3rem; font-weight: 700;'>🎮 3D Tic Tac Toe</h1>
-        <p style='margin: 0.5rem 0 0 0; font-size: 1.1rem; color: #666;'>4×4×4 Cube Challenge</p>
+    <div class='app-header'>
+        <h1>🎮 3D Tic Tac Toe</h1>
+        <p>4×4×4 Cube Challenge</p>
     </div>
 """, unsafe_allow_html=True)
 
@@ -413,113 +197,26 @@ with col_left:
         player_label = "Your turn" if st.session_state.current_player == 'X' else \
                       ("Bot's turn" if st.session_state.game_mode == 'bot' else f"Player {st.session_state.current_player}'s turn")
         st.info(f"📍 {player_label} • Move #{st.session_state.move_count + 1}")
+        if bot_is_thinking():
+            poll_bot_job(make_move)
         
         if st.session_state.moves_history:
             last_z, last_y, last_x, last_player = st.session_state.moves_history[-1]
             st.caption(f"Last: Player {last_player} at Layer {last_z+1}, Row {last_y+1}, Column {last_x+1}")
     
     # 3D Board
-    # Use move count in key to force refresh
-    st.plotly_chart(create_3d_board(), width='stretch', key=f"board_3d_{st.session_state.move_count}")
+    # A stable key keeps the same component, and its figure, alive across moves
+    board_3d(st.session_state.board, st.session_state.winning_line, key="board_3d")
     
     # 2D Layer Controls
     st.markdown("### 📊 Layer Controls")
     
-    # Custom CSS for grid buttons
-    st.markdown("""
-        <style>
-            /* Grid container styling */
-            .layer-grid {
-                display: grid;
-                grid-template-columns: repeat(4, 1fr);
-                gap: 1rem;
-                margin-bottom: 2rem;
-            }
-            
-            /* Layer title */
-            .layer-title {
-                text-align: center;
-                font-size: 1.2rem;
-                font-weight: bold;
-                margin-bottom: 0.5rem;
-                padding: 0.5rem;
-                background: #f0f2f6;
-                border-radius: 5px;
-            }
-            
-            /* Grid cell styling */
-            .grid-row {
-                display: grid;
-                grid-template-columns: repeat(4, 1fr);
-                gap: 0.5rem;
-                margin-bottom: 0.5rem;
-            }
-            
-            /* Button styling */
-            .stButton > button {
-                width: 100% !important;
-                height: 0 !important;
-                padding-bottom: 100% !important;
-                position: relative !important;
-                border: 2px solid #ddd !important;
-                background: white !important;
-                border-radius: 8px !important;
-                font-size: 24px !important;
-                font-weight: bold !important;
-                margin: 0 !important;
-            }
-            
-            .stButton > button:hover:not(:disabled) {
-                border-color: #888 !important;
-                transform: translateY(-2px) !important;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.1) !important;
-            }
-            
-            .stButton > button:disabled {
-                background: #f5f5f5 !important;
-                cursor: not-allowed !important;
-            }
-            
-            /* Layer separator */
-            .layer-separator {
-                height: 2px;
-                background: #ddd;
-                margin: 1rem 0;
-            }
-        </style>
-    """, unsafe_allow_html=True)
-    
-    # Create grid layout
-    layers = st.columns(4)
-    for z in range(4):
-        with layers[z]:
-            st.markdown(f'<div class="layer-title">Layer {z+1}</div>', unsafe_allow_html=True)
-            for y in range(4):
-                cols = st.columns(4)
-                for x in range(4):
-                    with cols[x]:
-                        cell_value = st.session_state.board[z, y, x]
-                        label = cell_value if cell_value else "·"
-                        disabled = st.session_state.game_over or cell_value != '' or \
-                                 (st.session_state.game_mode == 'bot' and st.session_state.current_player == 'O')
-                        
-                        # Custom button styling based on state
-                        button_style = """
-                            background-color: var(--primary-color) !important;
-                            color: white !important;
-                        """ if cell_value else ""
-                        
-                        if st.button(
-                            label,
-                            key=f"b_{z}_{y}_{x}",
-                            disabled=disabled,
-                            use_container_width=True
-                        ):
-                            make_move(z, y, x)
-            
-            # Add separator between layers
-            if z < 3:
-                st.markdown('<div class="layer-separator"></div>', unsafe_allow_html=True)
+    # All 64 cells in one widget, so a move is a single event
+    disabled = st.session_state.game_over or \
+               (st.session_state.game_mode == 'bot' and st.session_state.current_player == 'O')
+    clicked = board_input(st.session_state.board, disabled)
+    if clicked:
+        make_move(*clicked)
 
 with col_right:
     # Game Controls
@@ -536,8 +233,8 @@ with col_right:
     if st.session_state.game_mode == 'bot':
         difficulty = st.selectbox(
             "Difficulty",
-            ['Easy', 'Medium', 'Hard'],
-            index=['easy', 'medium', 'hard'].index(st.session_state.difficulty),
+            ['Easy', 'Medium', 'Hard', 'MCTS'],
+            index=['easy', 'medium', 'hard', 'mcts'].index(st.session_state.difficulty),
             key="difficulty_selector"
         )
         st.session_state.difficulty = difficulty.lower()
@@ -616,58 +313,11 @@ if st.session_state.get('is_admin', False):
             except Exception as e:
                 st.error(f"Error: {str(e)}")
 
-# Enhanced Styling
-st.markdown("""
-<style>
-    /* Button styling */
-    .stButton button {
-        font-size: 20px;
-        font-weight: bold;
-        height: 55px;
-        border-radius: 8px;
-        border: 2px solid #ddd;
-        transition: all 0.2s;
-    }
-    
-    .stButton button:hover:not(:disabled) {
-        border-color: #888;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        transform: translateY(-1px);
-    }
-    
-    .stButton button:disabled {
-        opacity: 0.4;
-    }
-    
-    /* Alert styling */
-    .stAlert {
-        border-radius: 10px;
-        border-left: 4px solid;
-        padding: 1rem;
-        font-size: 1.1rem;
-    }
-    
-    /* Metric styling */
-    [data-testid="stMetricValue"] {
-        font-size: 1.8rem;
-        font-weight: 700;
-    }
-    
-    /* Selectbox styling */
-    .stSelectbox {
-        margin-bottom: 1rem;
-    }
-    
-    /* Hide default Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    
-    /* Responsive adjustments */
-    @media (max-width: 768px) {
-        .stButton button {
-            height: 45px;
-            font-size: 18px;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+        st.markdown("**Bot service**")
+        st.json(bot_service_stats())
+
+        st.markdown("**Database cache**")
+        st.json(DatabaseManager.cache_stats())
+
+        st.markdown("**Database pool**")
+        st.json(DatabaseManager.pool_stats())
@@ -0,0 +1,120 @@
+"""Invariants of the bitboard, checked against brute force over random playouts."""
+
+import os
+import random
+import sys
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.bitboard import (
+    Board, CELLS, LINES, PLAYERS, SYMMETRIES, X, O, ZOBRIST, cell_coords, cell_index, line_score,
+)
+
+PLAYOUTS = 20
+
+
+def _brute_force_lines():
+    """Every set of four cells in a straight line, found by trying all starts and steps"""
+    lines = set()
+    for start in product(range(4), repeat=3):
+        for step in product((-1, 0, 1), repeat=3):
+            if step == (0, 0, 0):
+                continue
+            cells = [tuple(c + k * d for c, d in zip(start, step)) for k in range(4)]
+            if all(0 <= c < 4 for cell in cells for c in cell):
+                lines.add(frozenset(cell_index(*cell) for cell in cells))
+    return lines
+
+
+def _playouts():
+    """Boards after each move of seeded random games, played to a win or a full board"""
+    rng = random.Random(0)
+    for _ in range(PLAYOUTS):
+        board = Board()
+        cells = list(range(CELLS))
+        rng.shuffle(cells)
+        for ply, index in enumerate(cells):
+            board.play(index, ply % 2)
+            yield board
+            if board.last_move_wins() is not None:
+                break
+
+
+def _state(board):
+    return board.bits[:], board.sym_hash, [board.counts[X][:], board.counts[O][:]], board.score
+
+
+def _expected(board):
+    """Hash, line counts and score of board, computed from its pieces alone"""
+    hash_ = 0
+    counts = [[0] * len(LINES), [0] * len(LINES)]
+    for side in (X, O):
+        for index in range(CELLS):
+            if board.bits[side] >> index & 1:
+                hash_ ^= ZOBRIST[side][index]
+                for line_id, line in enumerate(LINES):
+                    counts[side][line_id] += index in line
+    score = sum(line_score(x, o) for x, o in zip(*counts))
+    return hash_, counts, score
+
+
+def _transformed(board, perm):
+    image = Board()
+    for index, side in board.history:
+        image.play(perm[index], side)
+    return image
+
+
+def test_there_are_76_lines():
+    assert len(LINES) == 76
+    assert {frozenset(line) for line in LINES} == _brute_force_lines()
+
+
+def test_play_keeps_hash_counts_and_score():
+    for board in _playouts():
+        hash_, counts, score = _expected(board)
+        assert board.hash == hash_
+        assert board.counts == counts
+        assert board.score == score
+
+
+def test_undo_restores_every_earlier_state():
+    rng = random.Random(1)
+    for _ in range(PLAYOUTS):
+        board = Board()
+        states = [_state(board)]
+        for ply, index in enumerate(rng.sample(range(CELLS), rng.randint(1, CELLS))):
+            board.play(index, ply % 2)
+            states.append(_state(board))
+        while board.history:
+            states.pop()
+            board.undo()
+            assert _state(board) == states[-1]
+        assert _state(board) == _state(Board())
+
+
+def test_sym_hash_holds_the_hash_of_each_symmetry():
+    for board in _playouts():
+        if len(board.history) % 7:
+            continue
+        key, symmetry = board.canonical()
+        for s, perm in enumerate(SYMMETRIES):
+            image = _transformed(board, perm)
+            assert board.sym_hash >> (64 * s) & ((1 << 64) - 1) == image.hash
+            assert image.canonical()[0] == key
+        assert _transformed(board, SYMMETRIES[symmetry]).hash == key
+
+
+def test_last_move_wins_matches_brute_force():
+    for board in _playouts():
+        index, side = board.history[-1]
+        completed = [
+            line_id for line_id, line in enumerate(LINES)
+            if index in line and all(board[cell_coords(cell)] == PLAYERS[side] for cell in line)
+        ]
+        line_id = board.last_move_wins()
+        if completed:
+            assert line_id in completed
+        else:
+            assert line_id is None
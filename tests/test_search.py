@@ -0,0 +1,183 @@
+"""Search results against plain minimax, and forced wins against the rules."""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import threats
+from engine.bitboard import Board, CELLS, O, PLAYERS, SIDE, X, cell_index
+from engine.search import WIN_SCORE, SearchContext, minimax, search_root
+from engine.transposition import TranspositionTable
+
+
+def _board(*moves):
+    board = Board()
+    for player, (z, y, x) in zip('XOXOXOXOXO', moves):
+        board.make_move(z, y, x, player)
+    return board
+
+
+def _random_positions(count, pieces, seed):
+    """Positions with no four in a row and X to move, from seeded random games"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board()
+        for ply, index in enumerate(rng.sample(range(CELLS), pieces)):
+            board.play(index, ply % 2)
+            if board.last_move_wins() is not None:
+                break
+        else:
+            positions.append(board)
+    return positions
+
+
+def _plain_minimax(board, depth, is_maximizing):
+    """Full-width minimax with the same scoring as search.minimax, and nothing else"""
+    if board.last_move_wins() is not None:
+        if board.history[-1][1] == O:
+            return WIN_SCORE + depth
+        return -WIN_SCORE - depth
+    if depth == 0 or board.is_full():
+        return board.score
+    side = O if is_maximizing else X
+    scores = []
+    for index in board.empty_indices():
+        board.play(index, side)
+        scores.append(_plain_minimax(board, depth - 1, not is_maximizing))
+        board.undo()
+    return max(scores) if is_maximizing else min(scores)
+
+
+# An opening, a middle game with threes about, and random late positions
+POSITIONS = [
+    _board((1, 1, 1), (2, 2, 2), (0, 0, 0)),
+    _board((0, 0, 0), (1, 1, 1), (0, 0, 1), (2, 2, 2), (0, 0, 2), (0, 0, 3), (3, 3, 3)),
+] + _random_positions(3, 44, seed=0) + _random_positions(3, 52, seed=1)
+
+
+def _depth(board):
+    # Keep the plain search to some ten thousand leaves; depth 4 is the first
+    # where transpositions are looked up in the table
+    empty = len(board.empty_indices())
+    if empty > 30:
+        return 2
+    return 3 if empty > 14 else 4
+
+
+def test_alpha_beta_matches_plain_minimax():
+    for board in POSITIONS:
+        # O is to move when the position has an odd number of pieces
+        maximizing = len(board.history) % 2 == 1
+        depth = _depth(board)
+        expected = _plain_minimax(board, depth, maximizing)
+        assert minimax(board, depth, maximizing, float('-inf'), float('inf')) == expected
+
+
+def test_transposition_table_matches_plain_minimax():
+    for board in POSITIONS:
+        maximizing = len(board.history) % 2 == 1
+        # One table through every depth, as iterative deepening uses it
+        table = TranspositionTable()
+        for depth in range(1, _depth(board) + 1):
+            expected = _plain_minimax(board, depth, maximizing)
+            context = SearchContext(table)
+            assert minimax(board, depth, maximizing, float('-inf'), float('inf'), context) == expected
+
+
+def test_table_reused_for_the_children_matches_plain_minimax():
+    for board in POSITIONS:
+        board = board.copy()
+        maximizing = len(board.history) % 2 == 1
+        depth = _depth(board)
+        table = TranspositionTable()
+        minimax(board, depth, maximizing, float('-inf'), float('inf'), SearchContext(table))
+        # The children's entries are mostly bounds from narrowed windows,
+        # which must not be taken for exact scores
+        side = O if maximizing else X
+        for index in board.empty_indices():
+            board.play(index, side)
+            expected = _plain_minimax(board, depth - 1, not maximizing)
+            context = SearchContext(table)
+            assert minimax(board, depth - 1, not maximizing, float('-inf'), float('inf'), context) == expected
+            board.undo()
+
+
+def test_search_root_skipping_symmetric_moves_matches_plain_minimax():
+    for board in POSITIONS:
+        board = board.copy()
+        if len(board.history) % 2 == 0:
+            board.play(board.empty_indices()[0], X)
+        depth = _depth(board) - 1
+        expected = {}
+        for index in board.empty_indices():
+            board.play(index, O)
+            expected[index] = _plain_minimax(board, depth, False)
+            board.undo()
+        score, move = search_root(board, depth, SearchContext(TranspositionTable()))
+        assert score == max(expected.values())
+        assert expected[move] == score
+
+
+def _assert_forces_win(board, player, sequence):
+    """Play sequence on board, checking the defender never had a way out"""
+    board = board.copy()
+    attacker = SIDE[player]
+    defender = 1 - attacker
+    for ply in range(0, len(sequence), 2):
+        z, y, x, mover = sequence[ply]
+        assert mover == player
+        board.make_move(z, y, x, mover)
+        if board.last_move_wins() is not None:
+            assert ply == len(sequence) - 1
+            return
+        z, y, x, mover = sequence[ply + 1]
+        assert mover == PLAYERS[defender]
+        block = cell_index(z, y, x)
+        # The defender cannot win at once, and any reply but the block loses
+        # to an immediate win; after a double threat the block loses too
+        for reply in board.empty_indices():
+            board.play(reply, defender)
+            assert board.last_move_wins() is None
+            if reply != block:
+                assert _has_immediate_win(board, attacker)
+            board.undo()
+        board.play(block, defender)
+    raise AssertionError("the sequence ends without a win")
+
+
+def _has_immediate_win(board, side):
+    for index in board.empty_indices():
+        board.play(index, side)
+        won = board.last_move_wins() is not None
+        board.undo()
+        if won:
+            return True
+    return False
+
+
+def test_forced_win_from_a_double_threat():
+    board = _board((0, 0, 1), (3, 3, 3), (0, 0, 2), (3, 3, 0), (0, 1, 0), (3, 0, 3), (0, 2, 0), (2, 1, 2))
+    sequence = threats.find_forced_win(board, 'X')
+    assert sequence is not None
+    assert sequence[0] == (0, 0, 0, 'X')
+    _assert_forces_win(board, 'X', sequence)
+
+
+def test_every_forced_win_found_forces_a_win():
+    rng = random.Random(2)
+    long_sequences = 0
+    for _ in range(15):
+        board = Board()
+        for ply, index in enumerate(rng.sample(range(CELLS), CELLS)):
+            board.play(index, ply % 2)
+            if board.last_move_wins() is not None:
+                break
+            player = PLAYERS[(ply + 1) % 2]
+            sequence = threats.find_forced_win(board, player)
+            if sequence:
+                _assert_forces_win(board, player, sequence)
+                long_sequences += len(sequence) > 1
+    assert long_sequences > 0
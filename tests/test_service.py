@@ -0,0 +1,41 @@
+"""Regression tests for BotService request handling."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.bitboard import Board
+from engine.service import BotService
+
+
+def _board(*moves):
+    board = Board()
+    for player, (z, y, x) in zip('XOXOXO', moves):
+        board.make_move(z, y, x, player)
+    return board
+
+
+def _assert_move(future, board):
+    move, stats = future.result(timeout=30)
+    assert board.is_empty(*move)
+    assert 'source' in stats
+
+
+def test_resubmit_after_cancel_gets_a_move():
+    service = BotService(workers=1)
+    board = _board((1, 1, 1))
+    service.submit(board, 'easy').cancel()
+    _assert_move(service.submit(board, 'easy'), board)
+
+
+def test_resubmit_after_cancel_while_queued_gets_a_move():
+    service = BotService(workers=1)
+    # Keep the only worker busy so the next request stays queued
+    blocker = service.submit(_board((0, 0, 0), (3, 3, 3)), 'hard')
+    board = _board((1, 1, 1))
+    service.submit(board, 'easy').cancel()
+    future = service.submit(board, 'easy')
+    blocker.cancel()
+    _assert_move(future, board)
+    assert service.stats()['cancelled'] >= 1